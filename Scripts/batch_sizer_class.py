@@ -0,0 +1,53 @@
+'''This file contains the BatchSizer class'''
+
+
+class BatchSizer:
+    '''This class chooses batch sizes that keep commits within a target latency and memory budget'''
+    # a batch may grow or shrink by at most this factor at a time
+    max_step = 2.0
+    
+    
+    def __init__(self, initial_size, target_latency, memory_budget, min_size, max_size):
+        '''This method sets the limits and the starting batch size'''
+        self.target_latency = target_latency
+        self.memory_budget = memory_budget
+        self.min_size = min_size
+        self.max_size = max_size
+        self.batch_size = self.clamp(initial_size)
+        self.history = []
+    
+    
+    def clamp(self, size):
+        '''This method keeps the size within the configured bounds'''
+        return max(self.min_size, min(self.max_size, int(size)))
+    
+    
+    def nextSize(self):
+        '''This method returns the size of the next batch'''
+        return self.batch_size
+    
+    
+    def recordBatch(self, no_of_rows, latency, no_of_bytes):
+        '''This method records a committed batch and adjusts the size towards the target latency'''
+        self.history.append((self.batch_size, no_of_rows, latency))
+        if no_of_rows <= 0 or latency <= 0:
+            return
+        ideal_size = no_of_rows * self.target_latency / latency
+        if no_of_bytes > 0:
+            ideal_size = min(ideal_size, self.memory_budget * no_of_rows / no_of_bytes)
+        factor = max(1 / self.max_step, min(self.max_step, ideal_size / self.batch_size))
+        self.batch_size = self.clamp(self.batch_size * factor)
+    
+    
+    def recordFailure(self):
+        '''This method halves the batch size after a failed batch so that the retry is cheaper'''
+        self.history.append((self.batch_size, 0, None))
+        self.batch_size = self.clamp(self.batch_size // 2)
+    
+    
+    def getSummary(self):
+        '''This method returns the smallest, largest and average size of the committed batches'''
+        sizes = [no_of_rows for _, no_of_rows, latency in self.history if latency is not None]
+        if not sizes:
+            return 'no batches committed'
+        return f'{len(sizes)} batches, sizes min {min(sizes)} / max {max(sizes)} / avg {sum(sizes) // len(sizes)}'
\ No newline at end of file
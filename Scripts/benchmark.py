@@ -0,0 +1,144 @@
+'''This file contains the benchmark harness generating synthetic customs data and measuring load throughput'''
+import os
+import re
+import sys
+import json
+import random
+import argparse
+from math import ceil
+from time import perf_counter
+from subprocess import Popen, PIPE, STDOUT
+from line_index import getIndexPath
+
+SCRIPT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'dbtodb.py')
+BATCH_PATTERN = re.compile(r'^Batch \d+ completed in ([0-9.e-]+) seconds')
+TABLE_SIZE_PATTERN = re.compile(r'^Table size on disk \(bytes\): (-?\d+)')
+
+
+def generateRow(rng):
+    '''This method generates one trade record following the layout in details.txt'''
+    return ','.join((
+        f'{rng.randint(1988, 2020)}{rng.randint(1, 12):02d}',
+        str(rng.randint(1, 2)),
+        f'{rng.randint(0, 999):03d}',
+        f'{rng.randint(0, 999):03d}',
+        f'{rng.randint(0, 999999999):09d}',
+        f'{rng.randint(0, 999999999999):012d}',
+        f'{rng.randint(0, 9999999999):010d}',
+        f'{rng.randint(0, 999999999):09d}'
+    ))
+
+
+def generateFile(file_path, no_of_rows, seed):
+    '''This method writes a synthetic csv with the given number of rows unless it already exists'''
+    if os.path.exists(file_path):
+        return file_path
+    rng = random.Random(seed)
+    with open(file_path, mode='w') as file_object:
+        for _ in range(no_of_rows):
+            file_object.write(generateRow(rng) + '\n')
+    return file_path
+
+
+def percentile(values, fraction):
+    '''This method returns the nearest-rank percentile of the values'''
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, ceil(fraction * len(ordered)) - 1))]
+
+
+def runLoad(file_path, batch_size, engine, settings, log_dir):
+    '''This method runs dbtodb.py on the file without prompts, restarting the load, and returns its throughput figures'''
+    data_dir, file_name = os.path.split(os.path.abspath(file_path))
+    environment = dict(os.environ)
+    environment.update(settings)
+    environment.update({
+        'FILE_LOC': data_dir + os.sep,
+        'FILE_NAME': file_name,
+        'LOGGER_FILE_LOC': log_dir + os.sep,
+        'LOGGER_FILE_NAME': 'benchmark.log'
+    })
+    # every run builds the line index itself, a cached one would only favour the runs after the first
+    if os.path.exists(getIndexPath(file_path)):
+        os.remove(getIndexPath(file_path))
+    command = [sys.executable, SCRIPT_PATH, '--file', os.path.abspath(file_path), '--header', 'no', '--resume', 'restart',
+        '--engine', engine, '--batch-size', str(batch_size)]
+    start = perf_counter()
+    process = Popen(command, stdin=PIPE, stdout=PIPE, stderr=STDOUT, env=environment, text=True)
+    process.stdin.close()
+    output = process.stdout.read()
+    _, status, usage = os.wait4(process.pid, 0)
+    process.returncode = os.waitstatus_to_exitcode(status)
+    elapsed = perf_counter() - start
+    latencies, table_size = [], None
+    for line in output.splitlines():
+        batch_match = BATCH_PATTERN.match(line)
+        if batch_match:
+            latencies.append(float(batch_match.group(1)))
+        size_match = TABLE_SIZE_PATTERN.match(line)
+        if size_match:
+            table_size = int(size_match.group(1))
+    file_size = os.path.getsize(file_path)
+    with open(file_path, mode='rb') as file_object:
+        no_of_rows = sum(chunk.count(b'\n') for chunk in iter(lambda: file_object.read(1 << 24), b''))
+    return {
+        'file': file_name,
+        'rows': no_of_rows,
+        'batch_size': batch_size,
+        'engine': engine,
+        'settings': settings,
+        'exit_code': process.returncode,
+        'seconds': elapsed,
+        'rows_per_second': no_of_rows / elapsed if elapsed else None,
+        'mb_per_second': file_size / 1048576 / elapsed if elapsed else None,
+        'peak_rss_kb': usage.ru_maxrss,
+        'batches': len(latencies),
+        'batch_latency_p50': percentile(latencies, 0.5),
+        'batch_latency_p99': percentile(latencies, 0.99),
+        'table_size_bytes': table_size
+    }
+
+
+def parseSettings(values):
+    '''This method parses KEY=VALUE pairs into a dict of environment variables'''
+    settings = {}
+    for value in values:
+        key, _, setting = value.partition('=')
+        settings[key] = setting
+    return settings
+
+
+def main():
+    '''This method generates the requested files and runs every combination of size, batch size and engine'''
+    parser = argparse.ArgumentParser(description='Benchmark dbtodb against a local PostgreSQL')
+    parser.add_argument('--rows', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[10000])
+    parser.add_argument('--engines', nargs='+', default=['insert', 'copy'])
+    parser.add_argument('--set', dest='settings', nargs='*', default=[], help='extra KEY=VALUE environment settings')
+    parser.add_argument('--data-dir', default='./Data')
+    parser.add_argument('--log-dir', default='./Logs')
+    parser.add_argument('--seed', type=int, default=1988)
+    parser.add_argument('--output', default=None, help='file to write the JSON report to')
+    args = parser.parse_args()
+
+    os.makedirs(args.data_dir, exist_ok=True)
+    os.makedirs(args.log_dir, exist_ok=True)
+    results = []
+    for no_of_rows in args.rows:
+        file_path = generateFile(os.path.join(args.data_dir, f'customs_bench_{no_of_rows}.csv'), no_of_rows, args.seed)
+        for batch_size in args.batch_sizes:
+            for engine in args.engines:
+                settings = parseSettings(args.settings)
+                result = runLoad(file_path, batch_size, engine, settings, os.path.abspath(args.log_dir))
+                print(f"{result['file']} batch={batch_size} engine={engine}: {result['rows_per_second']:.0f} rows/s", file=sys.stderr)
+                results.append(result)
+    report = json.dumps({'python': sys.version.split()[0], 'results': results}, indent=2)
+    if args.output:
+        with open(args.output, mode='w') as output_file:
+            output_file.write(report)
+    print(report)
+
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
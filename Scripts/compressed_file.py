@@ -0,0 +1,77 @@
+'''This file contains methods for detecting and opening compressed input files'''
+import io
+import bz2
+import gzip
+import lzma
+from prefetching_reader_class import PrefetchingReader
+
+MAGIC_NUMBERS = (
+    (b'\x1f\x8b', 'gzip'),
+    (b'BZh', 'bz2'),
+    (b'\xfd7zXZ\x00', 'xz'),
+    (b'\x28\xb5\x2f\xfd', 'zstd')
+)
+BUFFER_SIZE = 1 << 20
+FILE_SUFFIXES = {'gzip': '.gz', 'bz2': '.bz2', 'xz': '.xz', 'zstd': '.zst'}
+
+
+def detectCompression(file_path):
+    '''This method returns the compression of the file from its magic number, or None if it is plain'''
+    with open(file_path, mode='rb') as file_object:
+        head = file_object.read(6)
+    for magic_number, compression in MAGIC_NUMBERS:
+        if head.startswith(magic_number):
+            return compression
+    return None
+
+
+def openDecompressed(file_path, compression):
+    '''This method returns a binary stream of the decompressed contents of the file'''
+    if compression == 'gzip':
+        return gzip.open(file_path, mode='rb')
+    if compression == 'bz2':
+        return bz2.open(file_path, mode='rb')
+    if compression == 'xz':
+        return lzma.open(file_path, mode='rb')
+    if compression == 'zstd':
+        try:
+            import zstandard
+        except ImportError:
+            raise IOError('Reading zstd input needs the zstandard package')
+        return zstandard.ZstdDecompressor().stream_reader(open(file_path, mode='rb'), closefd=True)
+    raise IOError(f'Unsupported compression {compression}')
+
+
+def openCompressed(file_path, compression=None):
+    '''This method returns a binary stream writing into the file, compressing what is written if a compression is given'''
+    if not compression:
+        return open(file_path, mode='wb', buffering=BUFFER_SIZE)
+    if compression == 'gzip':
+        return gzip.open(file_path, mode='wb', compresslevel=6)
+    if compression == 'bz2':
+        return bz2.open(file_path, mode='wb')
+    if compression == 'xz':
+        return lzma.open(file_path, mode='wb')
+    if compression == 'zstd':
+        try:
+            import zstandard
+        except ImportError:
+            raise IOError('Writing zstd output needs the zstandard package')
+        return zstandard.ZstdCompressor().stream_writer(open(file_path, mode='wb'), closefd=True)
+    raise IOError(f'Unsupported compression {compression}')
+
+
+def openFile(file_path, mode='r', encoding=None, newline=None):
+    '''This method opens the file like open(), decompressing it in a background thread if it is compressed'''
+    compression = detectCompression(file_path)
+    if not compression:
+        if 'b' in mode:
+            return open(file_path, mode=mode)
+        return open(file_path, mode=mode, encoding=encoding, newline=newline)
+    if any(flag in mode for flag in 'wax+'):
+        raise IOError(f'Compressed file {file_path} can only be opened for reading')
+    raw = PrefetchingReader(lambda: openDecompressed(file_path, compression))
+    buffered = io.BufferedReader(raw, buffer_size=BUFFER_SIZE)
+    if 'b' in mode:
+        return buffered
+    return io.TextIOWrapper(buffered, encoding=encoding, newline=newline)
\ No newline at end of file
@@ -3,6 +3,8 @@ from os import environ
 from ast import literal_eval
 
 DBVARS = None
+POOL_SIZE = None
+SESSION_OPTIONS = None
 TABLE_NAME = None
 TABLE_COLS = None
 CREATE_QUERY = None
@@ -11,22 +13,110 @@ FILE_LOC = None
 FILE_NAME = None
 FILE_ENTRIES = None
 LOGGER_FILE_LOC = None
+LOG_LEVEL = None
+LOG_FORMAT = None
+LOG_ASYNC = None
 BATCH_SIZE = None
+ADAPTIVE_BATCH = None
+TARGET_COMMIT_LATENCY = None
+BATCH_MEMORY_BUDGET = None
+MIN_BATCH_SIZE = None
+MAX_BATCH_SIZE = None
+WORKERS = None
+CHECKPOINT_TABLE = None
+PIPELINE = None
+PREFETCH_BATCHES = None
+LOAD_ENGINE = None
+COPY_FORMAT = None
+SCHEMA_MODE = None
+SAMPLE_SIZE = None
+READER_MODE = None
+FILE_ENCODING = None
+CSV_DIALECT = None
+TABLE_MODE = None
+INDEX_COLUMNS = None
+FILE_PATTERN = None
+MULTI_FILE_TABLE = None
+MANIFEST_TABLE = None
+INCREMENTAL_SYNC = None
+SYNC_TABLE = None
+SYNC_VERIFY = None
+PARTITION_COLUMN = None
+PARTITION_SPOOL_DIR = None
+RELOAD_PARTITIONS = None
+UPSERT_KEYS = None
+UPSERT_ACTION = None
+METRICS_PORT = None
+STATS_FILE = None
+STATS_INTERVAL = None
+HAS_HEADER = None
+RESUME_POLICY = None
+EXPORT_TABLE = None
+EXPORT_DIR = None
+EXPORT_FORMAT = None
+EXPORT_COMPRESSION = None
+EXPORT_FETCH_ROWS = None
+TARGET_DBVARS = None
 
 
 def retrieveEnvironmentVariables():
-    global DBVARS, TABLE_NAME, TABLE_COLS, CREATE_QUERY, INSERT_QUERY, FILE_LOC, FILE_NAME, FILE_ENTRIES, LOGGER_FILE_LOC, BATCH_SIZE
+    global DBVARS, POOL_SIZE, SESSION_OPTIONS, TABLE_NAME, TABLE_COLS, CREATE_QUERY, INSERT_QUERY, FILE_LOC, FILE_NAME, FILE_ENTRIES, LOGGER_FILE_LOC, LOG_LEVEL, LOG_FORMAT, LOG_ASYNC, BATCH_SIZE, ADAPTIVE_BATCH, TARGET_COMMIT_LATENCY, BATCH_MEMORY_BUDGET, MIN_BATCH_SIZE, MAX_BATCH_SIZE, WORKERS, CHECKPOINT_TABLE, PIPELINE, PREFETCH_BATCHES, LOAD_ENGINE, COPY_FORMAT, SCHEMA_MODE, SAMPLE_SIZE, READER_MODE, FILE_ENCODING, CSV_DIALECT, TABLE_MODE, INDEX_COLUMNS, FILE_PATTERN, MULTI_FILE_TABLE, MANIFEST_TABLE, INCREMENTAL_SYNC, SYNC_TABLE, SYNC_VERIFY, PARTITION_COLUMN, PARTITION_SPOOL_DIR, RELOAD_PARTITIONS, UPSERT_KEYS, UPSERT_ACTION, METRICS_PORT, STATS_FILE, STATS_INTERVAL, HAS_HEADER, RESUME_POLICY, EXPORT_TABLE, EXPORT_DIR, EXPORT_FORMAT, EXPORT_COMPRESSION, EXPORT_FETCH_ROWS, TARGET_DBVARS
     try:
         DBVARS = literal_eval(environ.get('DBVARS', r'{}'))
+        POOL_SIZE = int(environ.get('POOL_SIZE', '4'))
+        SESSION_OPTIONS = literal_eval(environ.get('SESSION_OPTIONS', "{'synchronous_commit': 'off', 'work_mem': '64MB'}"))
         TABLE_NAME = environ.get('TRADE_TABLE', '')
         TABLE_COLS = literal_eval(environ.get('TRADE_TABLE_COLS', 'None'))
-        CREATE_QUERY = f"CREATE TABLE IF NOT EXISTS {TABLE_NAME} (" + ", ".join([f"{column[0]} {column[1]}" for column in TABLE_COLS]) + ");"
+        CREATE_QUERY = f"CREATE TABLE IF NOT EXISTS {TABLE_NAME} (" + ", ".join([f"{column} varchar" if isinstance(column, str) else f"{column[0]} {column[1] if len(column) > 1 else 'varchar'}" for column in TABLE_COLS]) + ");" if TABLE_COLS else None
         INSERT_QUERY = f"INSERT INTO {TABLE_NAME} VALUES (%s, %s, %s, %s, %s, %s, %s, %s);"
         FILE_LOC = environ.get('FILE_LOC', './') + environ.get('FILE_NAME', '')
         FILE_NAME = environ.get('FILE_NAME', '')
         FILE_ENTRIES = int(environ.get('FILE_ENTRIES', '0'))
         LOGGER_FILE_LOC = environ.get('LOGGER_FILE_LOC', './') + environ.get('LOGGER_FILE_NAME', '')
+        LOG_LEVEL = environ.get('LOG_LEVEL', 'Info')
+        LOG_FORMAT = environ.get('LOG_FORMAT', 'text').lower()
+        LOG_ASYNC = environ.get('LOG_ASYNC', 'n').lower() in ('y', 'yes', 'true', '1')
         BATCH_SIZE = int(environ.get('BATCH_SIZE', '10000'))
+        ADAPTIVE_BATCH = environ.get('ADAPTIVE_BATCH', 'n').lower() in ('y', 'yes', 'true', '1')
+        TARGET_COMMIT_LATENCY = float(environ.get('TARGET_COMMIT_LATENCY', '1.0'))
+        BATCH_MEMORY_BUDGET = int(environ.get('BATCH_MEMORY_BUDGET', str(64 * 1024 * 1024)))
+        MIN_BATCH_SIZE = int(environ.get('MIN_BATCH_SIZE', '1000'))
+        MAX_BATCH_SIZE = int(environ.get('MAX_BATCH_SIZE', '1000000'))
+        WORKERS = int(environ.get('WORKERS', '1'))
+        CHECKPOINT_TABLE = environ.get('CHECKPOINT_TABLE', 'dbtodb_checkpoints')
+        PIPELINE = environ.get('PIPELINE', 'n').lower() in ('y', 'yes', 'true', '1')
+        PREFETCH_BATCHES = max(1, int(environ.get('PREFETCH_BATCHES', '2')))
+        LOAD_ENGINE = environ.get('LOAD_ENGINE', 'insert').lower()
+        COPY_FORMAT = environ.get('COPY_FORMAT', 'csv').lower()
+        SCHEMA_MODE = environ.get('SCHEMA_MODE', 'varchar').lower()
+        SAMPLE_SIZE = int(environ.get('SAMPLE_SIZE', '10000'))
+        READER_MODE = environ.get('READER_MODE', 'split').lower()
+        FILE_ENCODING = environ.get('FILE_ENCODING', 'utf-8')
+        CSV_DIALECT = environ.get('CSV_DIALECT', 'excel')
+        TABLE_MODE = environ.get('TABLE_MODE', 'direct').lower()
+        INDEX_COLUMNS = literal_eval(environ.get('INDEX_COLUMNS', '()'))
+        FILE_PATTERN = environ.get('FILE_PATTERN', '')
+        MULTI_FILE_TABLE = environ.get('MULTI_FILE_TABLE', 'per_file').lower()
+        MANIFEST_TABLE = environ.get('MANIFEST_TABLE', 'dbtodb_manifest')
+        INCREMENTAL_SYNC = environ.get('INCREMENTAL_SYNC', 'n').lower() in ('y', 'yes', 'true', '1')
+        SYNC_TABLE = environ.get('SYNC_TABLE', 'dbtodb_sync_chunks')
+        SYNC_VERIFY = environ.get('SYNC_VERIFY', 'full').lower()
+        PARTITION_COLUMN = environ.get('PARTITION_COLUMN', '')
+        PARTITION_SPOOL_DIR = environ.get('PARTITION_SPOOL_DIR', environ.get('FILE_LOC', './') + 'partitions/')
+        RELOAD_PARTITIONS = literal_eval(environ.get('RELOAD_PARTITIONS', '()'))
+        UPSERT_KEYS = literal_eval(environ.get('UPSERT_KEYS', '()'))
+        UPSERT_ACTION = environ.get('UPSERT_ACTION', 'update').lower()
+        METRICS_PORT = int(environ.get('METRICS_PORT', '0'))
+        STATS_FILE = environ.get('STATS_FILE', '')
+        STATS_INTERVAL = float(environ.get('STATS_INTERVAL', '5.0'))
+        HAS_HEADER = environ.get('HAS_HEADER', 'ask').lower()
+        RESUME_POLICY = environ.get('RESUME_POLICY', 'ask').lower()
+        EXPORT_TABLE = environ.get('EXPORT_TABLE', '')
+        EXPORT_DIR = environ.get('EXPORT_DIR', environ.get('FILE_LOC', './') + 'export/')
+        EXPORT_FORMAT = environ.get('EXPORT_FORMAT', 'csv').lower()
+        EXPORT_COMPRESSION = environ.get('EXPORT_COMPRESSION', '').lower()
+        EXPORT_FETCH_ROWS = int(environ.get('EXPORT_FETCH_ROWS', '50000'))
+        TARGET_DBVARS = literal_eval(environ.get('TARGET_DBVARS', r'{}'))
         print('Env variables retrieved')
         return True
     except Exception as e:
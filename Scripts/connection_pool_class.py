@@ -0,0 +1,120 @@
+'''This file contains the ConnectionPool class'''
+import psycopg2
+from time import sleep, monotonic
+from threading import Lock
+from weakref import WeakSet, WeakKeyDictionary
+from psycopg2.pool import ThreadedConnectionPool
+from logger_class import Logger
+from config import DBVARS, POOL_SIZE, SESSION_OPTIONS
+
+
+class ConnectionPool:
+    '''Class containing methods to hand out validated connections from a shared pool'''
+    # class members
+    _instance = None
+    pool = None
+    lock = Lock()
+    # keyed on the connections themselves, the id of a connection the pool closed can be reused by a new one
+    prepared = WeakSet()
+    last_used = WeakKeyDictionary()
+    logger = Logger()
+    max_attempts = 5
+    # idle seconds after which a connection is checked with a round trip before use
+    validate_after = 30
+    
+    
+    def __new__(cls):
+        '''This method overrides new to make it a singleton'''
+        if not cls._instance:
+            cls._instance = super(ConnectionPool, cls).__new__(cls)
+        return cls._instance
+    
+    
+    def createPool(self):
+        '''This method creates the underlying psycopg2 pool if it doesn't exist'''
+        with self.lock:
+            if not self.pool:
+                self.pool = ThreadedConnectionPool(
+                    1,
+                    max(1, POOL_SIZE),
+                    database=DBVARS['database'],
+                    user=DBVARS['user'],
+                    password=DBVARS['password'],
+                    host=DBVARS['host'],
+                    port=DBVARS['port']
+                )
+                self.logger.logEvent('Info', f'Created connection pool with up to {POOL_SIZE} connections')
+    
+    
+    def prepareConnection(self, conn):
+        '''This method sets the session options for bulk loading on a new connection'''
+        conn.autocommit = False
+        with conn.cursor() as cur:
+            for option, value in SESSION_OPTIONS.items():
+                cur.execute('SELECT set_config(%s, %s, false);', (option, str(value)))
+        conn.commit()
+        self.prepared.add(conn)
+    
+    
+    def isHealthy(self, conn):
+        '''This method checks the connection, only doing a round trip if it has been idle for a while'''
+        if conn.closed:
+            return False
+        if monotonic() - self.last_used.get(conn, 0) < self.validate_after:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute('SELECT 1;')
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+    
+    
+    def getConnection(self):
+        '''This method returns a healthy connection, reconnecting with exponential backoff'''
+        for attempt in range(self.max_attempts):
+            try:
+                self.createPool()
+                conn = self.pool.getconn()
+                if not self.isHealthy(conn):
+                    self.logger.logEvent('Warning', f'Discarding dead DB connection - {conn}')
+                    self.releaseConnection(conn, is_broken=True)
+                    continue
+                if conn not in self.prepared:
+                    self.prepareConnection(conn)
+                return conn
+            except psycopg2.Error as pe:
+                delay = 0.5 * 2 ** attempt
+                self.logger.logEvent('Error', f'Could not get DB connection (attempt {attempt + 1}), retrying in {delay} seconds - {pe}')
+                sleep(delay)
+        return None
+    
+    
+    def releaseConnection(self, conn, is_broken=False):
+        '''This method returns the connection to the pool, closing it if it is broken'''
+        try:
+            is_broken = is_broken or bool(conn.closed)
+            if is_broken:
+                self.prepared.discard(conn)
+                self.last_used.pop(conn, None)
+            else:
+                self.last_used[conn] = monotonic()
+            if self.pool:
+                self.pool.putconn(conn, close=is_broken)
+        except psycopg2.Error as pe:
+            self.logger.logEvent('Error', f'Error while releasing DB connection: {pe}')
+    
+    
+    def closeAllConnections(self):
+        '''This method closes every connection of the pool'''
+        try:
+            with self.lock:
+                if self.pool:
+                    self.pool.closeall()
+                    self.pool = None
+                    self.prepared.clear()
+                    self.last_used.clear()
+                    self.logger.logEvent('Info', 'Closed all pooled DB connections')
+        except psycopg2.Error as pe:
+            self.logger.logEvent('Error', f'Error while closing pooled DB connections: {pe}')
\ No newline at end of file
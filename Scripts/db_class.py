@@ -1,49 +1,50 @@
 '''This file contains the DBConnection class'''
 import psycopg2
 from logger_class import Logger
-from config import DBVARS
+from connection_pool_class import ConnectionPool
 
 
 class DBConnection:
-    '''Class containing methods to connect to DB'''
+    '''Class containing methods to use a DB connection borrowed from the connection pool'''
     # class members
     conn = None
     cur = None
-    _instance = None
+    pool = ConnectionPool()
     logger = Logger()
     
     
-    def __new__(cls):
-        '''This method overrides new to make it a singleton'''
-        if not cls._instance:
-            cls._instance = super(DBConnection, cls).__new__(cls)
-        return cls._instance
-    
-    
     def dbConnect(self):
-        '''This method establishes a connection to DB and create table if they don't exist'''
+        '''This method borrows a healthy connection from the pool if none is held or the held one died'''
         try:
+            if self.conn and not self.conn.closed:
+                self.logger.logEvent('Debug', f'DB connection is already established')
+                return
+            if self.conn:
+                self.releaseConnection(is_broken=True)
+            self.conn = self.pool.getConnection()
             if not self.conn:
-                self.conn = psycopg2.connect(
-                    database=DBVARS['database'],
-                    user=DBVARS['user'],
-                    password=DBVARS['password'],
-                    host=DBVARS['host'],
-                    port=DBVARS['port']
-                )
-                self.conn.autocommit = False
-                self.cur = self.conn.cursor()
-                self.logger.logEvent('Info', f'Established new DB connection - {self.conn}')
-            self.logger.logEvent('Info', f'DB connection is already established')
+                self.logger.logEvent('Error', 'Could not initialize DB connection - pool gave no connection')
+                return
+            self.cur = self.conn.cursor()
+            self.logger.logEvent('Info', f'Established new DB connection - {self.conn}')
         except psycopg2.Error as pe:
             self.logger.logEvent('Error', f'Could not initialize DB connection - {pe}')
     
     
+    def releaseConnection(self, is_broken=False):
+        '''This method hands the held connection back to the pool'''
+        conn = self.conn
+        self.cur = None
+        self.conn = None
+        if conn:
+            self.pool.releaseConnection(conn, is_broken)
+    
+    
     def getConnection(self):
         '''This method returns DB connection object'''
         try:
             self.dbConnect()
-            self.logger.logEvent('Info', f'Getting DB connection - {self.conn}')
+            self.logger.logEvent('Debug', f'Getting DB connection - {self.conn}')
             return self.conn
         except psycopg2.Error as pe:
             self.logger.logEvent('Error', f'Could not get DB connection - {pe}')
@@ -54,7 +55,7 @@ class DBConnection:
         '''This method returns DB cursor object'''
         try:
             self.dbConnect()
-            self.logger.logEvent('Info', f'Getting DB cursor - {self.cur}')
+            self.logger.logEvent('Debug', f'Getting DB cursor - {self.cur}')
             return self.cur
         except psycopg2.Error as pe:
             self.logger.logEvent('Error', f'Could not get DB cursor - {pe}')
@@ -64,9 +65,11 @@ class DBConnection:
     def commitChanges(self):
         '''This method commits the changes to DB'''
         try:
-            self.dbConnect()
+            if not self.conn or self.conn.closed:
+                self.logger.logEvent('Error', 'Error while committing changes: connection is closed')
+                return False
             self.conn.commit()
-            self.logger.logEvent('Info', 'Commit Successful')
+            self.logger.logEvent('Debug', 'Commit Successful')
             return True
         except psycopg2.Error as pe:
             self.logger.logEvent('Error', f'Error while committing changes: {pe}')
@@ -76,23 +79,34 @@ class DBConnection:
     def rollback(self):
         '''This method rollbacks changes to DB'''
         try:
-            self.dbConnect()
+            if not self.conn or self.conn.closed:
+                self.releaseConnection(is_broken=True)
+                self.logger.logEvent('Warning', 'Connection was lost, it will be replaced on next use')
+                return
             self.conn.rollback()
             self.logger.logEvent('Info', 'Rollback Successful')
+        except (psycopg2.OperationalError, psycopg2.InterfaceError) as pe:
+            self.logger.logEvent('Error', f'Connection broke during rollback, it will be replaced on next use: {pe}')
+            self.releaseConnection(is_broken=True)
         except psycopg2.Error as pe:
             self.logger.logEvent('Error', f'Error while rollback: {pe}')
     
     
     def closeDbConnection(self):
-        '''This method disconnects DB if it is connected'''
+        '''This method returns the connection to the pool if one is held'''
         try:
             if self.conn:
-                self.cur.close()
-                self.conn.close()
-                self.cur = None
-                self.conn = None
-                self.logger.logEvent('Info', f'Closed connection to DB')
+                if not self.conn.closed:
+                    self.cur.close()
+                self.releaseConnection()
+                self.logger.logEvent('Info', f'Returned connection to the pool')
                 return
             self.logger.logEvent('Info', f'No open connections to close')
         except psycopg2.Error as pe:
-            self.logger.logEvent('Error', f'Error while closing DB Connection: {pe}')
\ No newline at end of file
+            self.logger.logEvent('Error', f'Error while closing DB Connection: {pe}')
+    
+    
+    def closeAllConnections(self):
+        '''This method returns the held connection and closes every pooled connection'''
+        self.closeDbConnection()
+        self.pool.closeAllConnections()
\ No newline at end of file
@@ -1,30 +1,80 @@
+import sys
+import json
+import argparse
 from time import perf_counter
-from config import BATCH_SIZE
-from file_reader_class import FileReader
-from helpers import startUp, getInsertionStartingBatch, insertBatch, shutdown
+from load_job import runJob, runJobs, HEADER_CHOICES, RESUME_CHOICES, ENGINE_CHOICES
+from table_export import exportTable, EXPORT_COMPRESSIONS
+from helpers import shutdown
+from logger_class import Logger
+from config import INCREMENTAL_SYNC, WORKERS, EXPORT_TABLE, EXPORT_DIR, EXPORT_FORMAT, EXPORT_COMPRESSION
 
-try:
-    script_start_time = perf_counter()
-    entries = startUp()
-    start = getInsertionStartingBatch(entries)
-    file_reader = FileReader()
+logger = Logger()
 
-    if start > -1:
-        start_time = perf_counter()
-        no_of_batches = file_reader.no_of_entries // BATCH_SIZE
-        if file_reader.no_of_entries % BATCH_SIZE != 0:
-            no_of_batches += 1
-        for curr_batch in range(start, no_of_batches):
-            insertBatch(curr_batch)
-        print('Overall insertion time:', perf_counter() - start_time)
-    else:
-        print('Invalid input')
 
-    shutdown()
-    print('Overall execution time:', perf_counter() - script_start_time)
-except KeyboardInterrupt as ke:
-    shutdown()
-    print('Execution was interrupted by keyboard input')
-except Exception as e:
-    shutdown()
-    print('Error occured while execution of program')
\ No newline at end of file
+def parseArguments():
+    '''This method parses the job given on the command line, anything left out comes from the environment'''
+    parser = argparse.ArgumentParser(description='Load csv files into PostgreSQL')
+    parser.add_argument('--file', default=None, help='file, directory or glob pattern to load')
+    parser.add_argument('--table', default=None, help='table to load into, named after the file by default')
+    parser.add_argument('--header', choices=HEADER_CHOICES, default=None, help='whether the file has a header, auto sniffs it')
+    parser.add_argument('--resume', choices=RESUME_CHOICES, default=None, help='what to do if the table already has entries')
+    parser.add_argument('--engine', choices=ENGINE_CHOICES, default=None)
+    parser.add_argument('--batch-size', type=int, default=None)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--dry-run', action='store_true', default=None, help='load a sample into a scratch table and estimate the load time')
+    parser.add_argument('--jobs', default=None, help='JSON file with a list of job specs to run one after another')
+    parser.add_argument('--export', default=EXPORT_TABLE, help='table to export instead of loading a file, into TARGET_DBVARS if set')
+    parser.add_argument('--output', default=EXPORT_DIR, help='directory the exported files are written into')
+    parser.add_argument('--format', choices=tuple(EXPORT_COMPRESSIONS), default=EXPORT_FORMAT)
+    parser.add_argument('--compression', default=EXPORT_COMPRESSION, help='csv: gzip, bz2, xz or zstd, parquet: snappy, gzip or zstd')
+    args = parser.parse_args()
+    # the defaults come from the environment and skip the choices check, so the pair is validated here
+    if args.export:
+        if args.format not in EXPORT_COMPRESSIONS:
+            parser.error(f'--format must be one of {tuple(EXPORT_COMPRESSIONS)}, got {args.format}')
+        if args.compression not in EXPORT_COMPRESSIONS[args.format]:
+            parser.error(f'{args.format} exports can not be compressed with {args.compression}, use one of {EXPORT_COMPRESSIONS[args.format][1:]}')
+    return args
+
+
+if __name__ == '__main__':
+    exit_code = 0
+    try:
+        script_start_time = perf_counter()
+        args = parseArguments()
+        if args.export:
+            start_time = perf_counter()
+            if not exportTable(args.export, args.output, args.format, args.compression, workers=args.workers or WORKERS):
+                exit_code = 1
+            print('Overall export time:', perf_counter() - start_time)
+        elif args.jobs:
+            with open(args.jobs, mode='r') as jobs_file:
+                results = runJobs(json.load(jobs_file))
+            print(json.dumps(results, indent=2))
+            if any(result is None or not result.get('successful', True) for result in results):
+                exit_code = 1
+        else:
+            spec = {key: value for key, value in vars(args).items() if key not in ('jobs', 'export', 'output', 'format', 'compression')}
+            result = runJob(spec)
+            if result is None:
+                print('Invalid input')
+                exit_code = 1
+            elif 'estimated_seconds' not in result:
+                print('Overall sync time:' if INCREMENTAL_SYNC else 'Overall insertion time:', result['seconds'])
+                if 'table_size' in result:
+                    print('Table size on disk (bytes):', result['table_size'])
+                if not result['successful']:
+                    exit_code = 1
+
+        shutdown()
+        print('Overall execution time:', perf_counter() - script_start_time)
+    except KeyboardInterrupt as ke:
+        shutdown()
+        print('Execution was interrupted by keyboard input')
+        exit_code = 1
+    except Exception as e:
+        logger.logEvent('Error', f'Error occured while execution of program: {e}')
+        shutdown()
+        print(f'Error occured while execution of program: {e}')
+        exit_code = 1
+    sys.exit(exit_code)
\ No newline at end of file
@@ -1,6 +1,13 @@
 '''This file contains the FileReader class'''
+import csv
+from itertools import islice
 from logger_class import Logger
+from metrics_class import Metrics
 from time import perf_counter
+from os import stat
+from hashlib import sha256
+from line_index import getLineIndex
+from compressed_file import detectCompression, openFile
 
 
 class FileReader:
@@ -9,8 +16,17 @@ class FileReader:
     file_object = None
     has_header = False
     no_of_entries = 0
-    values = None
+    current_entry = 0
+    reader_mode = 'split'
+    encoding = 'utf-8'
+    csv_dialect = 'excel'
+    csv_reader = None
+    file_identity = None
+    file_path = None
+    line_index = None
+    compression = None
     logger = Logger()
+    metrics = Metrics()
     
     
     def __new__(cls):
@@ -20,11 +36,29 @@ class FileReader:
         return cls._instance
     
     
+    def setReaderMode(self, reader_mode, encoding, csv_dialect):
+        '''This method sets how lines are parsed: split on commas, csv module or raw bytes'''
+        self.reader_mode = reader_mode
+        self.encoding = encoding
+        self.csv_dialect = csv_dialect
+    
+    
     def initializeFile(self, file_path, mode):
-        '''This method opens the given file'''
+        '''This method opens the given file, decompressing gzip, bz2, xz or zstd input on the fly'''
         try:
-            self.file_object = open(file_path, mode=mode)
-            self.logger.logEvent('Info', f'Initialized file {file_path} with mode {mode}')
+            if self.reader_mode == 'raw':
+                mode = mode if 'b' in mode else mode + 'b'
+                self.file_object = openFile(file_path, mode=mode)
+            elif self.reader_mode == 'csv':
+                self.file_object = openFile(file_path, mode=mode, encoding=self.encoding, newline='')
+                self.csv_reader = csv.reader(iter(self.file_object.readline, ''), dialect=self.csv_dialect)
+            else:
+                self.file_object = openFile(file_path, mode=mode, encoding=self.encoding)
+            self.file_path = file_path
+            self.line_index = None
+            self.compression = detectCompression(file_path)
+            self.file_identity = self.getFileIdentity(file_path)
+            self.logger.logEvent('Info', f'Initialized file {file_path} with mode {mode}' + (f' and {self.compression} compression' if self.compression else ''))
             return True
         except FileNotFoundError as fnfe:
             self.logger.logEvent('Error', f'File {file_path} not found - {fnfe}')
@@ -37,6 +71,14 @@ class FileReader:
             return False
     
     
+    def getFileIdentity(self, file_path, block_size=65536):
+        '''This method returns the size, mtime and hash of the first block of the given file'''
+        file_stat = stat(file_path)
+        with open(file_path, mode='rb') as file_object:
+            first_block_hash = sha256(file_object.read(block_size)).hexdigest()
+        return {'size': file_stat.st_size, 'mtime': file_stat.st_mtime, 'hash': first_block_hash}
+    
+    
     def setHasHeader(self, value):
         '''This method sets the has_header boolean'''
         self.has_header = value
@@ -53,6 +95,7 @@ class FileReader:
             self.file_object.seek(0)
             if self.has_header:
                 self.file_object.readline()
+            self.current_entry = 0
             self.logger.logEvent('Info', 'Moved to top of file')
         except Exception as e:
             self.logger.logEvent('Event', 'Failed to move to top of file')
@@ -63,9 +106,18 @@ class FileReader:
         try:
             if self.file_object:
                 start = perf_counter()
-                self.moveToTop()
-                for _ in range(line_number):
+                if self.line_index:
+                    raw_line_number = line_number + (1 if self.has_header else 0)
+                    offsets = self.line_index['offsets']
+                    position = min(raw_line_number // self.line_index['interval'], len(offsets) - 1)
+                    self.file_object.seek(offsets[position])
+                    lines_to_skip = raw_line_number - position * self.line_index['interval']
+                else:
+                    self.moveToTop()
+                    lines_to_skip = line_number
+                for _ in range(lines_to_skip):
                     self.file_object.readline()
+                self.current_entry = line_number
                 self.logger.logEvent('Info', f'Moved to line {line_number} in file in {perf_counter() - start} seconds')
             else:
                 self.logger.logEvent('Error', f'File has not been initialized to move to line')
@@ -81,13 +133,44 @@ class FileReader:
             return False
     
     
+    def getOffset(self):
+        '''This method returns the current position in the file'''
+        try:
+            return self.file_object.tell()
+        except Exception as e:
+            self.logger.logEvent('Error', f'Error while getting position in file - {e}')
+            return -1
+    
+    
+    def moveToOffset(self, offset, entry):
+        '''This method moves the pointer to a position returned by getOffset, where the given entry starts'''
+        try:
+            self.file_object.seek(offset)
+            self.current_entry = entry
+            self.logger.logEvent('Info', f'Moved to offset {offset} in file')
+            return True
+        except Exception as e:
+            self.logger.logEvent('Error', f'Error while moving to offset {offset} in file - {e}')
+            return False
+    
+    
     def getLines(self, no_of_lines):
         '''This method returns a tuple of lines'''
         try:
             start = perf_counter()
-            self.values = tuple(tuple(self.file_object.readline().rstrip('\r\n').split(',')) for _ in range(no_of_lines))
-            self.logger.logEvent('Info', f'Retrieved {no_of_lines} lines in {perf_counter() - start} seconds')
-            return self.values
+            readline = self.file_object.readline
+            if self.reader_mode == 'csv':
+                values = list(islice(self.csv_reader, no_of_lines))
+                no_of_lines = len(values)
+            elif self.reader_mode == 'raw':
+                values = [readline().decode(self.encoding).rstrip('\r\n').split(',') for _ in range(no_of_lines)]
+            else:
+                values = tuple(tuple(readline().rstrip('\r\n').split(',')) for _ in range(no_of_lines))
+            self.current_entry += no_of_lines
+            elapsed = perf_counter() - start
+            self.metrics.addStageTime('parse', elapsed)
+            self.logger.logEvent('Info', f'Retrieved {no_of_lines} lines in {elapsed} seconds ({elapsed * 1000000 / max(1, no_of_lines)} seconds per million rows)')
+            return values
         except IOError as ioe:
             self.logger.logEvent('Error', f'IOError while getting lines from file - {ioe}')
             return tuple()
@@ -99,15 +182,35 @@ class FileReader:
             return tuple()
     
     
-    def getNumberOfEntries(self):
-        '''This method returns the number of entries in the file'''
+    def getRawLines(self, no_of_lines):
+        '''This method returns the next lines of the file as one unparsed block'''
+        try:
+            start = perf_counter()
+            readline = self.file_object.readline
+            newline = b'\n' if self.reader_mode == 'raw' else '\n'
+            block = newline[:0].join([readline() for _ in range(no_of_lines)])
+            self.current_entry += no_of_lines
+            if block and not block.endswith(newline):
+                block += newline
+            elapsed = perf_counter() - start
+            self.metrics.addStageTime('read', elapsed)
+            self.logger.logEvent('Info', f'Retrieved raw block of {no_of_lines} lines in {elapsed} seconds')
+            return block
+        except IOError as ioe:
+            self.logger.logEvent('Error', f'IOError while getting raw lines from file - {ioe}')
+            return ''
+        except Exception as e:
+            self.logger.logEvent('Error', f'Error while getting raw lines from file - {e}')
+            return ''
+    
+    
+    def getNumberOfEntries(self, index_interval=10000, workers=1):
+        '''This method returns the number of entries in the file using the cached or freshly built line index'''
         try:
             if self.file_object:
                 start = perf_counter()
-                count = 0
-                self.moveToTop()
-                while self.file_object.readline():
-                    count += 1
+                self.line_index = getLineIndex(self.file_path, index_interval, self.file_identity, workers)
+                count = self.line_index['count']
                 self.moveToTop()
                 self.logger.logEvent('Info', f'{count} entries detected in file in {perf_counter() - start} seconds')
                 return count
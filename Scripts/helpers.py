@@ -1,66 +1,245 @@
 '''This file contains several helper methods'''
+import re
+import csv
+from os import path
 from time import perf_counter
 from logger_class import Logger
 from file_reader_class import FileReader
-from config import FILE_LOC, FILE_NAME , LOGGER_FILE_LOC, BATCH_SIZE
+from config import FILE_LOC, FILE_NAME , LOGGER_FILE_LOC, LOG_LEVEL, LOG_FORMAT, LOG_ASYNC, BATCH_SIZE, WORKERS, CHECKPOINT_TABLE, LOAD_ENGINE, COPY_FORMAT, TABLE_COLS, SCHEMA_MODE, SAMPLE_SIZE, READER_MODE, FILE_ENCODING, CSV_DIALECT, ADAPTIVE_BATCH, TARGET_COMMIT_LATENCY, BATCH_MEMORY_BUDGET, MIN_BATCH_SIZE, MAX_BATCH_SIZE, TABLE_MODE, INDEX_COLUMNS, PIPELINE, MANIFEST_TABLE, INCREMENTAL_SYNC, SYNC_TABLE, PARTITION_COLUMN, UPSERT_KEYS, UPSERT_ACTION, METRICS_PORT, STATS_FILE, STATS_INTERVAL, HAS_HEADER, RESUME_POLICY
 from db_class import DBConnection
 from table_operations_class import TableOperations
+from parallel_loader import loadInParallel, splitFileIntoRanges
+from pipeline_loader import loadPipelined
+from schema_inference import inferColumnTypes, detectHeader
+from batch_sizer_class import BatchSizer
+from incremental_sync import syncFile
+from metrics_class import Metrics
 
 logger = Logger()
 db_connection = DBConnection()
 table_operations = TableOperations()
 file_reader = FileReader()
+metrics = Metrics()
+MAX_ADAPTIVE_FAILURES = 3
+STAGING_SUFFIX = '_staging'
+COMPRESSION_SUFFIXES = ('.gz', '.bz2', '.xz', '.zst')
+# file being loaded and its target table, changed by useInputFile when loading several files
+input_file = FILE_LOC
+input_file_name = FILE_NAME
+target_table = None
+is_shared_table = False
+# batch size and engine of the current load, changed by useLoadSettings when running jobs
+load_batch_size = BATCH_SIZE
+load_engine = LOAD_ENGINE
+# position of PARTITION_COLUMN among the file columns, set by startUp
+partition_column_index = None
+copy_options = {
+    'csv': ['FORMAT csv'],
+    'text': ['FORMAT text', "DELIMITER ','"],
+    'binary': ['FORMAT binary']
+}
 
 
-def startUp():
-    '''This method creates logger, file object and a DB Connection'''
+def getTableNameFromFile(file_name):
+    '''This method derives a table name from the file name, dropping the compression and csv extensions'''
+    for suffix in COMPRESSION_SUFFIXES:
+        if file_name.endswith(suffix):
+            file_name = file_name[:-len(suffix)]
+    if file_name.endswith('.csv'):
+        file_name = file_name[:-len('.csv')]
+    # the name goes into queries unquoted, so it is reduced to a plain lowercase identifier
+    table_name = re.sub(r'\W', '_', file_name.lower())
+    if not table_name or table_name[0].isdigit():
+        table_name = 't_' + table_name
+    return table_name
+
+
+def useInputFile(file_path, table_name=None, is_shared=False):
+    '''This method sets the file to load and the table it goes into, shared with other files if is_shared is set'''
+    global input_file, input_file_name, target_table, is_shared_table
+    input_file = file_path
+    input_file_name = path.basename(file_path)
+    target_table = table_name
+    is_shared_table = is_shared
+
+
+def useLoadSettings(batch_size=None, engine=None):
+    '''This method sets the batch size and engine of the next loads, falling back to the configured ones'''
+    global load_batch_size, load_engine
+    load_batch_size = batch_size or BATCH_SIZE
+    load_engine = engine or LOAD_ENGINE
+
+
+def getHasHeader(header=HAS_HEADER):
+    '''This method tells if the input file has a header by asking, sniffing its first lines or taking the given yes or no'''
+    if header == 'ask':
+        return input(f'Does the file have header?[y/n]: ').lower() == 'y'
+    if header == 'auto':
+        has_header = detectHeader(input_file, encoding=FILE_ENCODING, csv_dialect=CSV_DIALECT)
+        logger.logEvent('Info', f'Detected {"a" if has_header else "no"} header in {input_file_name}')
+        return has_header
+    return header in ('y', 'yes', 'true', '1')
+
+
+def getTableName():
+    '''This method returns the name of the final table, derived from the file name unless a target table is set'''
+    return target_table or getTableNameFromFile(input_file_name)
+
+
+def isStagingLoad():
+    '''This method tells if rows go through a staging table, which a shared, synced or partitioned table cannot use'''
+    return TABLE_MODE == 'staging' and not is_shared_table and not INCREMENTAL_SYNC and not PARTITION_COLUMN
+
+
+def getLoadTableName():
+    '''This method returns the name of the table rows are loaded into, the staging table in staging mode'''
+    if isStagingLoad():
+        return getTableName() + STAGING_SUFFIX
+    return getTableName()
+
+
+def getCheckpointKey():
+    '''This method returns the key of the checkpoint of the input file, which includes the file name in a shared table'''
+    if is_shared_table:
+        return f'{getLoadTableName()}:{input_file_name}'
+    return getLoadTableName()
+
+
+def startUp(has_header=None, workers=WORKERS):
+    '''This method creates logger, file object and a DB Connection, following HAS_HEADER unless has_header is given'''
+    global partition_column_index
     try:
-        logger.initializeLogger(LOGGER_FILE_LOC, 'a+')
-        file_reader.initializeFile(file_path=FILE_LOC, mode='r')
+        logger.initializeLogger(LOGGER_FILE_LOC, 'a+', LOG_LEVEL, LOG_FORMAT, LOG_ASYNC)
+        file_reader.setReaderMode(READER_MODE, FILE_ENCODING, CSV_DIALECT)
+        file_reader.initializeFile(file_path=input_file, mode='r')
         print('Retrieving number of entries in csv')
-        no_of_entries = file_reader.getNumberOfEntries()
+        no_of_entries = file_reader.getNumberOfEntries(load_batch_size, workers)
         columns = file_reader.getLines(1)[0]
         no_of_cols = len(columns)
         db_connection.dbConnect()
         table_operations.setDatabaseAndCursor(db_connection)
         
-        table_name = FILE_NAME.rstrip('.csv')
-        insert_query = [f'INSERT INTO {table_name} VALUES ', '(' + ', '.join([r'%s'] * no_of_cols) + ')']
-        create_query = f'CREATE TABLE {table_name} (' + ', '.join([f"col{i} varchar" for i in range(no_of_cols)]) + ');'
+        table_name = getLoadTableName()
+        # with upsert keys, batches are bulk loaded into a temporary table and merged from there
+        batch_table = f'{table_name}_batch' if UPSERT_KEYS else table_name
+        insert_query = [f'INSERT INTO {batch_table} VALUES ', '(' + ', '.join([r'%s'] * no_of_cols) + ')']
+        options = list(copy_options.get(COPY_FORMAT, copy_options['csv']))
+        delimiter = csv.get_dialect(CSV_DIALECT).delimiter
+        if COPY_FORMAT == 'csv' and delimiter != ',':
+            options.append(f"DELIMITER '{delimiter}'")
+        if READER_MODE == 'raw' and COPY_FORMAT != 'binary':
+            options.append(f"ENCODING '{FILE_ENCODING}'")
+        column_names = [f'col{i}' for i in range(no_of_cols)]
         
-        hasHeader = input(f'Does the file have header?[y/n]: ')
-        if hasHeader.lower() == 'y':
-            create_query = f'CREATE TABLE {table_name} (' + ', '.join([f"{columns[i].replace(' ', '_')} varchar" for i in range(no_of_cols)]) + ');'
-            file_reader.setHasHeader(True)
+        if has_header is None:
+            has_header = getHasHeader()
+        file_reader.setHasHeader(has_header)
+        if has_header:
+            column_names = [columns[i].replace(' ', '_') for i in range(no_of_cols)]
             no_of_entries -= 1
         
+        column_types = ['varchar'] * no_of_cols
+        existing_types = None
+        if SCHEMA_MODE == 'infer':
+            # an existing table keeps its types, a new sample could infer narrower ones that binary COPY can't load into it
+            existing_columns = table_operations.getColumnDefinitions(table_name)
+            if existing_columns and len(existing_columns) >= no_of_cols:
+                existing_types = [column_type for _, column_type in existing_columns[:no_of_cols]]
+            else:
+                offsets = file_reader.line_index['offsets'] if file_reader.line_index else []
+                column_types = inferColumnTypes(input_file, offsets, file_reader.has_header, no_of_cols, SAMPLE_SIZE, FILE_ENCODING, CSV_DIALECT)
+        # TABLE_COLS lists a name or a (name, type) pair per column, a given type overrides the inferred one
+        for i, column in enumerate((TABLE_COLS or ())[:no_of_cols]):
+            column = (column,) if isinstance(column, str) else tuple(column)
+            column_names[i] = column[0]
+            if len(column) > 1 and column[1]:
+                column_types[i] = column[1]
+        if existing_types:
+            column_types = existing_types
+        # in an incremental sync rows get their chunk from a column default, so COPY names the file columns
+        copy_columns = ' (' + ', '.join(column_names) + ')' if INCREMENTAL_SYNC else ''
+        copy_query = f'COPY {batch_table}{copy_columns} FROM STDIN WITH (' + ', '.join(options) + ')'
+        upsert_queries = None
+        if UPSERT_KEYS:
+            keys = ', '.join(UPSERT_KEYS)
+            updates = [f'{column_name} = EXCLUDED.{column_name}' for column_name in column_names if column_name not in UPSERT_KEYS]
+            if UPSERT_ACTION == 'update' and updates:
+                # the last line of a key in the batch wins, a key can only be updated once per statement
+                merge_query = (f'INSERT INTO {table_name} SELECT DISTINCT ON ({keys}) * FROM {batch_table} ORDER BY {keys}, ctid DESC '
+                    f'ON CONFLICT ({keys}) DO UPDATE SET ' + ', '.join(updates) + ';')
+            else:
+                merge_query = f'INSERT INTO {table_name} SELECT * FROM {batch_table} ON CONFLICT ({keys}) DO NOTHING;'
+            upsert_queries = (f'CREATE TEMP TABLE IF NOT EXISTS {batch_table} (LIKE {table_name} INCLUDING DEFAULTS) ON COMMIT DELETE ROWS;', merge_query)
+        partition_clause = ''
+        # partitions are loaded as input files of their own into an existing table, only the parent is partitioned here
+        is_partition_parent = PARTITION_COLUMN and not target_table
+        if is_partition_parent:
+            partition_column_index = column_names.index(PARTITION_COLUMN)
+            partition_clause = f' PARTITION BY RANGE ({PARTITION_COLUMN})'
+        create_query = f'CREATE {"UNLOGGED " if isStagingLoad() else ""}TABLE IF NOT EXISTS {table_name} (' + ', '.join([f"{column_names[i]} {column_types[i]}" for i in range(no_of_cols)]) + ')' + partition_clause + ';'
+        if SCHEMA_MODE == 'infer' or TABLE_COLS:
+            table_operations.setColumnTypes(column_types)
+        
         file_reader.moveToTop()
         file_reader.setNumberOfEntries(no_of_entries)
         table_operations.setInsertQuery(insert_query)
+        table_operations.setCopyQuery(copy_query, COPY_FORMAT, FILE_ENCODING, CSV_DIALECT)
         table_operations.createTable(table_name, create_query)
+        if UPSERT_KEYS and not is_partition_parent and not table_operations.createUniqueKey(table_name, UPSERT_KEYS):
+            return -1
+        table_operations.setUpsertQueries(upsert_queries)
+        table_operations.setCheckpointTable(CHECKPOINT_TABLE)
+        table_operations.createCheckpointTable()
+        table_operations.setManifestTable(MANIFEST_TABLE)
         logger.logEvent('Info', 'Startup successful')
+        checkpoint = table_operations.getCheckpoint(getCheckpointKey(), file_reader.file_identity)
+        if checkpoint:
+            # checkpoints written before the final batch number was stored have none
+            position = f'batch {checkpoint["batch_number"] + 1}' if checkpoint['batch_number'] is not None else f'row {checkpoint["row_count"]}'
+            logger.logEvent('Info', f'Found checkpoint of {getCheckpointKey()} at {position}')
+            return checkpoint['row_count']
+        if is_shared_table:
+            return 0
         return table_operations.getCount(table_name)
     except Exception as e:
         logger.logEvent('Error', f'Error during startup: {e}')
         return -1
 
 
-def getInsertionStartingBatch(entries):
-    '''This method get the starting batch for the insertion of data'''
+def getInsertionStartingBatch(entries, resume=RESUME_POLICY):
+    '''This method get the starting batch for the insertion of data, asking how to proceed unless the resume policy decides'''
     try:
-        table_name = FILE_NAME.rstrip('.csv')
-        if entries == -1 or entries == 0:
+        table_name = getLoadTableName()
+        if entries == -1:
+            logger.logEvent('Error', f'Could not determine the entries already loaded into {table_name}, not loading into it')
+            return -1
+        if entries == 0:
             logger.logEvent('Info', 'No entries, creating table if not exists')
             return 0
-        decision = input(f'{entries} entries detected in table, would you like to continue where you left off?[y/n]: ')
-        if decision.lower() == 'y':
-            file_reader.moveToLine(entries)
+        decision = resume
+        if resume == 'ask':
+            decision = input(f'{entries} entries detected in table, would you like to continue where you left off?[y/n]: ')
+        decision = {'y': 'resume', 'n': 'restart'}.get(decision.lower(), decision.lower())
+        if decision == 'resume':
+            if table_operations.getRangeCheckpoints(getCheckpointKey(), file_reader.file_identity):
+                logger.logEvent('Info', f'Continuing the parallel load of {entries} entries from its range checkpoints')
+                return 0
+            checkpoint = table_operations.getCheckpoint(getCheckpointKey(), file_reader.file_identity)
+            if checkpoint and checkpoint['row_count'] == entries:
+                file_reader.moveToOffset(checkpoint['byte_offset'], checkpoint['row_count'])
+            else:
+                logger.logEvent('Warning', 'No usable checkpoint, falling back to moving through the file line by line')
+                file_reader.moveToLine(entries)
             logger.logEvent('Info', f'Continuing insertion from entry {entries}')
-            return entries // BATCH_SIZE
-        if decision.lower() == 'n':
+            return entries // load_batch_size
+        if decision == 'restart':
             table_operations.truncateTable(table_name)
+            table_operations.deleteCheckpoint(getCheckpointKey())
             logger.logEvent('Info', 'Restarting insertion')
             return 0
+        if decision == 'fail':
+            logger.logEvent('Error', f'{entries} entries detected in {table_name}, not loading into it')
+            return -1
         logger.logEvent('Warning', 'Invalid input while choosing how to process with insertion')
         return -1
     except Exception as e:
@@ -68,29 +247,289 @@ def getInsertionStartingBatch(entries):
         return -1
 
 
-def insertBatch(curr_batch):
-    '''This method inserts the batch and moves on to the next if successful'''
+def insertBatch(curr_batch, batch_size=None):
+    '''This method inserts the next batch_size entries of the file and returns whether it was successful'''
     try:
+        batch_size = batch_size or load_batch_size
         batch_start_time = perf_counter()
-        lines = file_reader.getLines(min(BATCH_SIZE, file_reader.no_of_entries - (BATCH_SIZE * curr_batch)))
-        is_insertion_successful = table_operations.insertRows(lines)
-        if is_insertion_successful:
-            msg = f'Batch {curr_batch + 1} completed in {perf_counter() - batch_start_time} seconds'
-            print(msg)
-            logger.logEvent('Info', msg)
+        checkpoint_key = getCheckpointKey()
+        rows_before = file_reader.current_entry
+        no_of_lines = min(batch_size, file_reader.no_of_entries - rows_before)
+        if no_of_lines <= 0:
+            return True
+        batch_offset = file_reader.getOffset()
+        if load_engine == 'copy':
+            block = file_reader.getRawLines(no_of_lines)
+            table_operations.setCheckpoint(checkpoint_key, file_reader.file_identity, curr_batch, file_reader.getOffset(), file_reader.current_entry, batch_size)
+            is_insertion_successful = table_operations.copyRows(block, no_of_lines)
         else:
-            msg = f'Batch {curr_batch + 1} failed after {perf_counter() - batch_start_time} seconds. Retrying'
+            lines = file_reader.getLines(no_of_lines)
+            table_operations.setCheckpoint(checkpoint_key, file_reader.file_identity, curr_batch, file_reader.getOffset(), file_reader.current_entry, batch_size)
+            is_insertion_successful = table_operations.insertRows(lines)
+        duration = perf_counter() - batch_start_time
+        if is_insertion_successful:
+            metrics.recordBatch(no_of_lines, file_reader.getOffset() - batch_offset)
+            msg = f'Batch {curr_batch + 1} completed in {duration} seconds'
             print(msg)
-            logger.logEvent('Error', msg)
-            file_reader.moveToLine(curr_batch * BATCH_SIZE)
+            logger.logEvent('Info', msg, batch=curr_batch + 1, rows=no_of_lines, duration=duration)
+            return True
+        msg = f'Batch {curr_batch + 1} failed after {duration} seconds. Retrying'
+        print(msg)
+        logger.logEvent('Error', msg, batch=curr_batch + 1, rows=no_of_lines, duration=duration)
+        file_reader.moveToOffset(batch_offset, rows_before)
+        return False
     except Exception as e:
         logger.logEvent('Error', f'Error during insertion of batch {curr_batch + 1}: {e}')
+        return False
+
+
+def getBatchSizer():
+    '''This method returns a batch sizer if adaptive batching is enabled'''
+    if not ADAPTIVE_BATCH:
+        return None
+    return BatchSizer(load_batch_size, TARGET_COMMIT_LATENCY, BATCH_MEMORY_BUDGET, MIN_BATCH_SIZE, MAX_BATCH_SIZE)
+
+
+def insertBatchesAdaptively(start):
+    '''This method inserts the remaining entries in batches sized to keep the time spent inserting and committing them within the target commit latency'''
+    try:
+        sizer = getBatchSizer()
+        curr_batch = start
+        failures = 0
+        while file_reader.current_entry < file_reader.no_of_entries:
+            batch_size = sizer.nextSize()
+            rows_before = file_reader.current_entry
+            offset_before = file_reader.getOffset()
+            if insertBatch(curr_batch, batch_size):
+                sizer.recordBatch(file_reader.current_entry - rows_before, table_operations.commit_latency, file_reader.getOffset() - offset_before)
+                curr_batch += 1
+                failures = 0
+                continue
+            sizer.recordFailure()
+            failures += 1
+            if failures > MAX_ADAPTIVE_FAILURES:
+                logger.logEvent('Error', f'Batch {curr_batch + 1} failed {failures} times in a row, stopping')
+                return False
+        logger.logEvent('Info', f'Adaptive batch sizes: {sizer.getSummary()}')
+        return True
+    except Exception as e:
+        logger.logEvent('Error', f'Error during adaptive insertion: {e}')
+        return False
+
+
+def loadFileInParallel(workers=WORKERS):
+    '''This method loads the file in byte ranges across worker processes, resuming the ranges of an interrupted parallel load'''
+    try:
+        table_name = getLoadTableName()
+        checkpoint_key = getCheckpointKey()
+        ranges = table_operations.getRangeCheckpoints(checkpoint_key, file_reader.file_identity)
+        if ranges is None:
+            return False
+        if ranges:
+            logger.logEvent('Info', f'Resuming parallel load of {input_file_name} from the checkpoints of {len(ranges)} ranges')
+        elif table_operations.getCount(table_name) != 0:
+            logger.logEvent('Info', 'Table already has entries, continuing sequentially')
+            return None
+        if file_reader.compression:
+            logger.logEvent('Info', f'{file_reader.compression} input cannot be split into byte ranges, continuing sequentially')
+            return None
+        queries = {
+            'column_types': table_operations.column_types,
+            'insert': table_operations.insert_query,
+            'copy': table_operations.copy_query,
+            'copy_format': table_operations.copy_format,
+            'reader_mode': file_reader.reader_mode,
+            'encoding': file_reader.encoding,
+            'csv_dialect': file_reader.csv_dialect,
+            'upsert': table_operations.upsert_queries,
+            'batch_size': load_batch_size,
+            'load_engine': load_engine,
+            'checkpoint_table': CHECKPOINT_TABLE,
+            'checkpoint_key': checkpoint_key,
+            'file_identity': file_reader.file_identity
+        }
+        if not ranges:
+            ranges = {
+                range_id: {'committed': start, 'end': end, 'rows': 0}
+                for range_id, (start, end) in enumerate(splitFileIntoRanges(input_file, workers, file_reader.has_header))
+            }
+            # ranges commit out of order, so each one is resumed from its own checkpoint rather than the row count
+            if not table_operations.writeRangeCheckpoints(checkpoint_key, file_reader.file_identity, ranges):
+                return False
+        if not loadInParallel(input_file, ranges, queries, workers):
+            return False
+        last_batch = max(0, file_reader.no_of_entries - 1) // load_batch_size
+        return table_operations.finishRangeCheckpoints(checkpoint_key, file_reader.file_identity, last_batch, file_reader.file_identity['size'], file_reader.no_of_entries)
+    except Exception as e:
+        logger.logEvent('Error', f'Error during parallel load: {e}')
+        return False
+
+
+def hasRangeCheckpoints():
+    '''This method tells if an interrupted parallel load of the input file left range checkpoints behind'''
+    return bool(table_operations.getRangeCheckpoints(getCheckpointKey(), file_reader.file_identity))
+
+
+def insertBatchesPipelined(start):
+    '''This method inserts the batches while the next ones are read ahead of the loader'''
+    try:
+        return loadPipelined(file_reader, table_operations, getCheckpointKey(), start, getBatchSizer(), load_batch_size, load_engine)
+    except Exception as e:
+        logger.logEvent('Error', f'Error during pipelined insertion: {e}')
+        return False
+
+
+def finishStagingLoad(is_load_complete=None):
+    '''This method swaps the staging table into place once every entry of the file is loaded into it'''
+    try:
+        staging_table = getLoadTableName()
+        # rows merged on upsert keys make the table smaller than the file, so progress is taken from the reader or checkpoint
+        loaded_entries = file_reader.current_entry
+        if loaded_entries < file_reader.no_of_entries:
+            checkpoint = table_operations.getCheckpoint(getCheckpointKey(), file_reader.file_identity)
+            loaded_entries = checkpoint['row_count'] if checkpoint else loaded_entries
+        if is_load_complete is None:
+            is_load_complete = loaded_entries >= file_reader.no_of_entries
+        if not is_load_complete:
+            msg = f'Staging table {staging_table} has {loaded_entries} of {file_reader.no_of_entries} entries, keeping it to resume later'
+            print(msg)
+            logger.logEvent('Warning', msg)
+            return False
+        if not table_operations.promoteStagingTable(staging_table, getTableName(), INDEX_COLUMNS):
+            return False
+        table_operations.deleteCheckpoint(getCheckpointKey())
+        return True
+    except Exception as e:
+        logger.logEvent('Error', f'Error while finishing staging load: {e}')
+        return False
+
+
+def insertRemainingBatches(start):
+    '''This method inserts the batches from start on with the configured strategy and returns whether every entry got loaded'''
+    if PIPELINE:
+        return insertBatchesPipelined(start)
+    if ADAPTIVE_BATCH:
+        return insertBatchesAdaptively(start)
+    no_of_batches = file_reader.no_of_entries // load_batch_size
+    if file_reader.no_of_entries % load_batch_size != 0:
+        no_of_batches += 1
+    for curr_batch in range(start, no_of_batches):
+        insertBatch(curr_batch)
+    return file_reader.current_entry >= file_reader.no_of_entries
+
+
+def resumeFromCheckpoint():
+    '''This method moves to the checkpoint of the input file without asking and returns the starting batch'''
+    try:
+        checkpoint = table_operations.getCheckpoint(getCheckpointKey(), file_reader.file_identity)
+        if checkpoint:
+            file_reader.moveToOffset(checkpoint['byte_offset'], checkpoint['row_count'])
+            logger.logEvent('Info', f'Continuing {input_file_name} from entry {checkpoint["row_count"]}')
+            return checkpoint['row_count'] // load_batch_size
+        table_name = getLoadTableName()
+        if not is_shared_table and table_operations.getCount(table_name) > 0:
+            logger.logEvent('Warning', f'Table {table_name} has entries but no checkpoint of {input_file_name}, reloading it')
+            table_operations.truncateTable(table_name)
+        return 0
+    except Exception as e:
+        logger.logEvent('Error', f'Error while resuming {input_file_name} from its checkpoint: {e}')
+        return -1
+
+
+def loadInputFile(has_header):
+    '''This method loads the input file without prompting, resuming from its checkpoint, and records it in the manifest once complete'''
+    try:
+        if has_header is None:
+            has_header = getHasHeader('auto')
+        if startUp(has_header, workers=1) == -1:
+            return -1
+        start = resumeFromCheckpoint()
+        if start == -1:
+            return -1
+        is_load_successful = insertRemainingBatches(start)
+        if is_load_successful and isStagingLoad():
+            is_load_successful = finishStagingLoad(is_load_successful)
+        if not is_load_successful:
+            logger.logEvent('Error', f'Loading {input_file_name} stopped at entry {file_reader.current_entry} of {file_reader.no_of_entries}')
+            return -1
+        table_operations.createManifestTable()
+        table_operations.writeManifestEntry(input_file_name, getTableName(), file_reader.file_identity, file_reader.no_of_entries)
+        if is_shared_table:
+            table_operations.deleteCheckpoint(getCheckpointKey())
+        return file_reader.no_of_entries
+    except Exception as e:
+        logger.logEvent('Error', f'Error while loading {input_file_name}: {e}')
+        return -1
+
+
+def getPendingFiles(files, getTable):
+    '''This method connects to the DB and returns the files that the manifest doesn't record as loaded into their table'''
+    try:
+        logger.initializeLogger(LOGGER_FILE_LOC, 'a+', LOG_LEVEL, LOG_FORMAT, LOG_ASYNC)
+        db_connection.dbConnect()
+        table_operations.setDatabaseAndCursor(db_connection)
+        table_operations.setManifestTable(MANIFEST_TABLE)
+        table_operations.createManifestTable()
+        pending_files = []
+        for file_path in files:
+            if table_operations.isFileLoaded(path.basename(file_path), getTable(file_path), file_reader.getFileIdentity(file_path)):
+                logger.logEvent('Info', f'Skipping {file_path}, the manifest records it as loaded')
+                continue
+            pending_files.append(file_path)
+        return pending_files
+    except Exception as e:
+        logger.logEvent('Error', f'Error while checking the manifest: {e}')
+        return None
+
+
+def syncInputFile():
+    '''This method loads only the new or changed chunks of the input file into its table'''
+    try:
+        table_name = getLoadTableName()
+        table_operations.setSyncTable(SYNC_TABLE)
+        table_operations.createSyncTable()
+        if not table_operations.addChunkColumn(table_name):
+            return False
+        synced_chunks = table_operations.getSyncChunks(table_name)
+        if synced_chunks is None:
+            return False
+        if not synced_chunks and table_operations.getCount(table_name) > 0:
+            logger.logEvent('Warning', f'Table {table_name} has entries that were not synced by chunk, reloading it')
+            table_operations.truncateTable(table_name)
+        return syncFile(file_reader, table_operations, table_name, synced_chunks, load_engine)
+    except Exception as e:
+        logger.logEvent('Error', f'Error during incremental sync: {e}')
+        return False
+
+
+def getTableSize():
+    '''This method returns the on-disk size of the target table'''
+    return table_operations.getTableSize(getTableName())
+
+
+def startMetrics():
+    '''This method starts measuring the load from the current entry, serving the metrics or writing them to a file if configured'''
+    metrics.startLoad(file_reader.no_of_entries, file_reader.current_entry, STATS_INTERVAL)
+    if METRICS_PORT:
+        metrics.startServer(METRICS_PORT)
+    if STATS_FILE:
+        metrics.startStatsFile(STATS_FILE, STATS_INTERVAL)
+
+
+def finishJob():
+    '''This method closes the input file and returns the connection to the pool, keeping both ready for the next job'''
+    try:
+        file_reader.closeFile()
+        db_connection.closeDbConnection()
+    except Exception as e:
+        logger.logEvent('Error', f'Error while finishing job: {e}')
 
 
 def shutdown():
     '''This method closes connections'''
     try:
-        db_connection.closeDbConnection()
+        metrics.stop()
+        db_connection.closeAllConnections()
         file_reader.closeFile()
         logger.closeLogger()
         logger.logEvent('Info', 'Shutdown successful')
@@ -0,0 +1,100 @@
+'''This file contains methods for syncing a growing file by loading only its new or changed chunks'''
+from time import perf_counter
+from logger_class import Logger
+from metrics_class import Metrics
+from line_index import getChunkRange, hashChunks
+from config import LOAD_ENGINE, SYNC_VERIFY
+
+logger = Logger()
+metrics = Metrics()
+FINGERPRINT_SAMPLES = 8
+
+
+def getFingerprintChunks(chunk_numbers):
+    '''This method picks the chunks whose hashes fingerprint the synced prefix: the first, the last and a few spread between'''
+    chunk_numbers = sorted(chunk_numbers)
+    step = max(1, len(chunk_numbers) // FINGERPRINT_SAMPLES)
+    return set(chunk_numbers[::step]) | {chunk_numbers[0], chunk_numbers[-1]}
+
+
+def findChangedChunks(file_path, line_index, synced_chunks):
+    '''This method returns the chunks to load: the tail after an unchanged prefix, or every chunk whose hash differs'''
+    no_of_chunks = len(line_index['offsets'])
+    new_chunks = [chunk_number for chunk_number in range(no_of_chunks) if chunk_number not in synced_chunks]
+    prefix = sorted(chunk_number for chunk_number in synced_chunks if chunk_number < no_of_chunks)
+    if not prefix:
+        return new_chunks
+    # only the last synced chunk may have grown, a moved end anywhere else means lines were changed
+    moved = [chunk_number for chunk_number in prefix if synced_chunks[chunk_number][1] != getChunkRange(line_index, chunk_number)[1]]
+    if SYNC_VERIFY != 'full' and moved in ([], [prefix[-1]]):
+        sample = getFingerprintChunks(prefix) - set(moved)
+        hashes = hashChunks(file_path, line_index, sample)
+        if all(hashes[chunk_number] == synced_chunks[chunk_number][0] for chunk_number in sample):
+            logger.logEvent('Info', f'Prefix of {prefix[-1] + 1 - len(moved)} chunks is unchanged, syncing the tail')
+            return moved + new_chunks
+        logger.logEvent('Warning', 'Prefix fingerprint changed, comparing every chunk')
+    start = perf_counter()
+    hashes = hashChunks(file_path, line_index, prefix)
+    changed = [chunk_number for chunk_number in prefix if hashes[chunk_number] != synced_chunks[chunk_number][0]]
+    logger.logEvent('Info', f'Compared {len(prefix)} chunks in {perf_counter() - start} seconds, {len(changed)} changed')
+    return changed + new_chunks
+
+
+def syncChunks(file_reader, table_operations, table_name, chunks, load_engine=LOAD_ENGINE):
+    '''This method replaces the rows of each given chunk with its current lines, one transaction per chunk'''
+    line_index = file_reader.line_index
+    interval = line_index['interval']
+    hashes = hashChunks(file_reader.file_path, line_index, chunks)
+    metrics.startLoad(sum(min(interval, line_index['count'] - chunk_number * interval) for chunk_number in chunks), 0, metrics.progress_interval)
+    try:
+        for i, chunk_number in enumerate(chunks):
+            chunk_start_time = perf_counter()
+            start, end = getChunkRange(line_index, chunk_number)
+            first_line = chunk_number * interval
+            no_of_lines = min(first_line + interval, line_index['count']) - first_line
+            if chunk_number == 0 and file_reader.has_header:
+                file_reader.moveToTop()
+                no_of_lines -= 1
+            else:
+                file_reader.moveToOffset(start, first_line - (1 if file_reader.has_header else 0))
+            if no_of_lines <= 0:
+                continue
+            table_operations.setChunk(table_name, chunk_number, hashes[chunk_number], end)
+            if load_engine == 'copy':
+                is_insertion_successful = table_operations.copyRows(file_reader.getRawLines(no_of_lines), no_of_lines)
+            else:
+                is_insertion_successful = table_operations.insertRows(file_reader.getLines(no_of_lines))
+            duration = perf_counter() - chunk_start_time
+            if not is_insertion_successful:
+                msg = f'Chunk {chunk_number + 1} failed after {duration} seconds, it will be synced on the next run'
+                print(msg)
+                logger.logEvent('Error', msg)
+                return False
+            metrics.recordBatch(no_of_lines, end - start)
+            msg = f'Chunk {chunk_number + 1} ({i + 1} of {len(chunks)}) synced in {duration} seconds'
+            print(msg)
+            logger.logEvent('Info', msg, chunk=chunk_number + 1, rows=no_of_lines, duration=duration)
+        return True
+    finally:
+        table_operations.clearChunk()
+
+
+def syncFile(file_reader, table_operations, table_name, synced_chunks, load_engine=LOAD_ENGINE):
+    '''This method brings the table in line with the file, loading only new and changed chunks'''
+    no_of_chunks = len(file_reader.line_index['offsets'])
+    if any(chunk_number >= no_of_chunks for chunk_number in synced_chunks):
+        logger.logEvent('Warning', f'File has fewer chunks than were synced, dropping chunks from {no_of_chunks + 1} on')
+        if not table_operations.deleteChunksFrom(table_name, no_of_chunks):
+            return False
+    chunks = findChangedChunks(file_reader.file_path, file_reader.line_index, synced_chunks)
+    # chunks that only moved keep their rows, their recorded end is updated so the next sync can take the fast path
+    moved_ends = {
+        chunk_number: getChunkRange(file_reader.line_index, chunk_number)[1] for chunk_number, (_, end_offset) in synced_chunks.items()
+        if chunk_number < no_of_chunks and chunk_number not in chunks and end_offset != getChunkRange(file_reader.line_index, chunk_number)[1]
+    }
+    if moved_ends and not table_operations.updateChunkEnds(table_name, moved_ends):
+        return False
+    msg = f'{len(chunks)} of {no_of_chunks} chunks to sync'
+    print(msg)
+    logger.logEvent('Info', msg)
+    return syncChunks(file_reader, table_operations, table_name, chunks, load_engine)
\ No newline at end of file
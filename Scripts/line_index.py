@@ -0,0 +1,151 @@
+'''This file contains methods for counting lines in bulk and building a sparse line offset index'''
+import json
+from hashlib import sha256
+from os import path
+from multiprocessing import get_context
+from logger_class import Logger
+from compressed_file import detectCompression, openFile
+
+logger = Logger()
+CHUNK_SIZE = 16 * 1024 * 1024
+MIN_PARALLEL_SIZE = 64 * 1024 * 1024
+
+
+def findNthNewline(chunk, start, n, line_length):
+    '''This method returns the position of the n-th newline of the chunk after start, jumping ahead by n average lines and walking the few lines it is off'''
+    guess = min(len(chunk), start + int(n * line_length))
+    seen = chunk.count(b'\n', start, guess)
+    if seen >= n:
+        # overshot, the n-th newline is the (seen - n + 1)-th one back from the guess
+        position = guess
+        for _ in range(seen - n + 1):
+            position = chunk.rfind(b'\n', start, position)
+        return position
+    position = guess - 1
+    for _ in range(n - seen):
+        position = chunk.find(b'\n', position + 1)
+    return position
+
+
+def scanRange(file_path, start, end, lines_before, interval):
+    '''This method counts the newlines in a byte range, up to the end of the file if end is None, and returns the offsets of lines that are multiples of interval'''
+    count = 0
+    offsets = []
+    last_byte = b''
+    with openFile(file_path, mode='rb') as file_object:
+        file_object.seek(start)
+        position = start
+        while end is None or position < end:
+            chunk = file_object.read(CHUNK_SIZE if end is None else min(CHUNK_SIZE, end - position))
+            if not chunk:
+                break
+            last_byte = chunk[-1:]
+            chunk_count = chunk.count(b'\n')
+            if interval:
+                seen = lines_before + count
+                chunk_end = seen + chunk_count
+                next_boundary = (seen // interval + 1) * interval
+                search_from = 0
+                line_length = len(chunk) / chunk_count if chunk_count else 0
+                while next_boundary <= chunk_end:
+                    newline = findNthNewline(chunk, search_from, next_boundary - seen, line_length)
+                    offsets.append(position + newline + 1)
+                    seen = next_boundary
+                    search_from = newline + 1
+                    next_boundary += interval
+            count += chunk_count
+            position += len(chunk)
+    return count, offsets, position, last_byte
+
+
+def splitRanges(file_size, no_of_ranges):
+    '''This method splits the file size into roughly equal byte ranges'''
+    step = max(1, file_size // no_of_ranges)
+    boundaries = list(range(0, file_size, step))[:no_of_ranges] + [file_size]
+    return [(boundaries[i], boundaries[i + 1]) for i in range(len(boundaries) - 1)]
+
+
+def buildLineIndex(file_path, interval, workers=1):
+    '''This method counts the lines of the file and records the offset of every interval-th line'''
+    if detectCompression(file_path):
+        # compressed input can only be scanned as one stream, offsets are positions in the decompressed data
+        newlines, offsets, file_size, last_byte = scanRange(file_path, 0, None, 0, interval)
+    elif workers > 1 and path.getsize(file_path) >= MIN_PARALLEL_SIZE:
+        file_size = path.getsize(file_path)
+        ranges = splitRanges(file_size, workers)
+        with get_context('spawn').Pool(workers) as pool:
+            counts = [result[0] for result in pool.starmap(scanRange, [(file_path, start, end, 0, None) for start, end in ranges])]
+            lines_before = [sum(counts[:i]) for i in range(len(counts))]
+            results = pool.starmap(scanRange, [(file_path, start, end, lines_before[i], interval) for i, (start, end) in enumerate(ranges)])
+        newlines = sum(counts)
+        offsets = [offset for result in results for offset in result[1]]
+        last_byte = results[-1][3]
+    else:
+        newlines, offsets, file_size, last_byte = scanRange(file_path, 0, path.getsize(file_path), 0, interval)
+    count = newlines
+    if file_size and last_byte != b'\n':
+        count += 1
+    return {'interval': interval, 'count': count, 'size': file_size, 'offsets': [0] + [offset for offset in offsets if offset < file_size]}
+
+
+def getChunkRange(line_index, chunk_number):
+    '''This method returns the byte range of the chunk holding the lines between two consecutive index offsets'''
+    offsets = line_index['offsets']
+    end = offsets[chunk_number + 1] if chunk_number + 1 < len(offsets) else line_index['size']
+    return offsets[chunk_number], end
+
+
+def hashChunks(file_path, line_index, chunk_numbers):
+    '''This method returns the hash of each of the given chunks of the file'''
+    hashes = {}
+    with openFile(file_path, mode='rb') as file_object:
+        for chunk_number in sorted(chunk_numbers):
+            start, end = getChunkRange(line_index, chunk_number)
+            file_object.seek(start)
+            chunk_hash = sha256()
+            position = start
+            while position < end:
+                data = file_object.read(min(CHUNK_SIZE, end - position))
+                if not data:
+                    break
+                chunk_hash.update(data)
+                position += len(data)
+            hashes[chunk_number] = chunk_hash.hexdigest()
+    return hashes
+
+
+def getIndexPath(file_path):
+    '''This method returns the path of the cached index next to the data file'''
+    return file_path + '.idx'
+
+
+def loadCachedIndex(file_path, interval, file_identity):
+    '''This method returns the cached index if it was built for the same file and interval'''
+    try:
+        with open(getIndexPath(file_path), mode='r') as index_file:
+            line_index = json.load(index_file)
+        if line_index.get('identity') != file_identity or line_index.get('interval') != interval or 'size' not in line_index:
+            logger.logEvent('Info', f'Cached line index of {file_path} is stale')
+            return None
+        return line_index
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.logEvent('Warning', f'Could not read cached line index of {file_path} - {e}')
+        return None
+
+
+def getLineIndex(file_path, interval, file_identity, workers=1):
+    '''This method returns the line index of the file, building and caching it if needed'''
+    line_index = loadCachedIndex(file_path, interval, file_identity)
+    if line_index:
+        logger.logEvent('Info', f'Reusing cached line index of {file_path}')
+        return line_index
+    line_index = buildLineIndex(file_path, interval, workers)
+    line_index['identity'] = file_identity
+    try:
+        with open(getIndexPath(file_path), mode='w') as index_file:
+            json.dump(line_index, index_file)
+    except Exception as e:
+        logger.logEvent('Warning', f'Could not cache line index of {file_path} - {e}')
+    return line_index
\ No newline at end of file
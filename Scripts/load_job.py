@@ -0,0 +1,181 @@
+'''This file contains methods for running loads as jobs, from the command line or as a library without prompts'''
+import glob
+from os import path
+from time import perf_counter
+from logger_class import Logger
+from multi_file_loader import loadFiles
+from partition_loader import loadPartitioned
+from config import FILE_LOC, FILE_NAME, TABLE_NAME, LOGGER_FILE_LOC, LOG_LEVEL, LOG_FORMAT, LOG_ASYNC, BATCH_SIZE, WORKERS, LOAD_ENGINE, TABLE_MODE, FILE_PATTERN, INCREMENTAL_SYNC, PARTITION_COLUMN, HAS_HEADER, RESUME_POLICY
+import helpers
+
+logger = Logger()
+HEADER_CHOICES = ('ask', 'auto', 'yes', 'no')
+RESUME_CHOICES = ('ask', 'resume', 'restart', 'fail')
+ENGINE_CHOICES = ('insert', 'copy')
+DRY_RUN_SUFFIX = '_dryrun'
+DRY_RUN_BATCHES = 3
+# a job runs with these settings unless its spec gives others
+JOB_DEFAULTS = {
+    # FILE_LOC alone is the data directory, so without FILE_NAME there is no default file
+    'file': FILE_PATTERN or (FILE_LOC if FILE_NAME else None),
+    'table': None,
+    'header': HAS_HEADER,
+    'resume': RESUME_POLICY,
+    'engine': LOAD_ENGINE,
+    'batch_size': BATCH_SIZE,
+    'workers': WORKERS,
+    'dry_run': False
+}
+
+
+def getJobSpec(spec):
+    '''This method fills in the defaults of a job spec and returns it, or None if a setting is invalid'''
+    job = dict(JOB_DEFAULTS)
+    job.update({key: value for key, value in spec.items() if value is not None})
+    unknown_keys = set(job) - set(JOB_DEFAULTS)
+    if unknown_keys:
+        logger.logEvent('Error', f'Unknown job settings {sorted(unknown_keys)}')
+        return None
+    if not job['file']:
+        logger.logEvent('Error', 'Job has no input file, pass --file or set FILE_NAME or FILE_PATTERN')
+        return None
+    if isinstance(job['header'], bool):
+        job['header'] = 'yes' if job['header'] else 'no'
+    job['header'] = {'y': 'yes', 'n': 'no', 'true': 'yes', 'false': 'no'}.get(str(job['header']).lower(), str(job['header']).lower())
+    for key, choices in (('header', HEADER_CHOICES), ('resume', RESUME_CHOICES), ('engine', ENGINE_CHOICES)):
+        if job[key] not in choices:
+            logger.logEvent('Error', f'Job setting {key} must be one of {choices}, got {job[key]}')
+            return None
+    if int(job['batch_size']) < 1 or int(job['workers']) < 1:
+        logger.logEvent('Error', 'Job batch size and workers must be positive')
+        return None
+    job['batch_size'], job['workers'] = int(job['batch_size']), int(job['workers'])
+    return job
+
+
+def isFilePattern(file_path):
+    '''This method tells if the input names a directory or glob pattern instead of a single file'''
+    return path.isdir(file_path) or glob.has_magic(file_path)
+
+
+def loadSingleFile(job):
+    '''This method loads the input file with the configured strategy and returns whether every entry got loaded'''
+    workers = job['workers']
+    has_header = helpers.getHasHeader(job['header'])
+    if PARTITION_COLUMN:
+        if helpers.startUp(has_header, workers) == -1:
+            return False
+        helpers.startMetrics()
+        return loadPartitioned(workers)
+    if INCREMENTAL_SYNC:
+        if helpers.startUp(has_header, workers) == -1:
+            return False
+        helpers.startMetrics()
+        return helpers.syncInputFile()
+    entries = helpers.startUp(has_header, workers)
+    start = helpers.getInsertionStartingBatch(entries, job['resume'])
+    if start == -1:
+        print('Invalid input')
+        return False
+    helpers.startMetrics()
+    is_load_successful = None
+    # an interrupted parallel load is resumed range by range even with a single worker
+    if start == 0 and (workers > 1 or helpers.hasRangeCheckpoints()):
+        is_load_successful = helpers.loadFileInParallel(workers)
+    if is_load_successful is None:
+        is_load_successful = helpers.insertRemainingBatches(start)
+    if TABLE_MODE == 'staging':
+        is_load_successful = helpers.finishStagingLoad(bool(is_load_successful))
+    return is_load_successful
+
+
+def estimateJob(job):
+    '''This method loads a few batches into a scratch table and extrapolates how long loading the whole file takes'''
+    table_name = job['table'] or helpers.getTableName()
+    scratch_table = table_name + DRY_RUN_SUFFIX
+    helpers.useInputFile(job['file'], scratch_table)
+    start_time = perf_counter()
+    if helpers.startUp(helpers.getHasHeader(job['header']), job['workers']) == -1:
+        return None
+    startup_seconds = perf_counter() - start_time
+    file_reader = helpers.file_reader
+    table_operations = helpers.table_operations
+    load_table = helpers.getLoadTableName()
+    try:
+        table_operations.truncateTable(load_table)
+        sample_start_time = perf_counter()
+        for curr_batch in range(DRY_RUN_BATCHES):
+            if file_reader.current_entry >= file_reader.no_of_entries:
+                break
+            if not helpers.insertBatch(curr_batch, job['batch_size']):
+                logger.logEvent('Error', f'Dry run could not load batch {curr_batch + 1} into {load_table}')
+                return None
+        sample_seconds = perf_counter() - sample_start_time
+        sample_rows = file_reader.current_entry
+    finally:
+        table_operations.deleteCheckpoint(helpers.getCheckpointKey())
+        table_operations.dropTable(load_table)
+    rows_per_second = sample_rows / sample_seconds if sample_seconds else 0.0
+    load_seconds = file_reader.no_of_entries / rows_per_second if rows_per_second else 0.0
+    estimate = {
+        'file': job['file'],
+        'table': table_name,
+        'entries': file_reader.no_of_entries,
+        'sample_rows': sample_rows,
+        'rows_per_second': rows_per_second,
+        'startup_seconds': startup_seconds,
+        'estimated_seconds': startup_seconds + load_seconds
+    }
+    msg = (f"Dry run of {job['file']}: {sample_rows} of {estimate['entries']} entries loaded at {rows_per_second:.0f} rows/s, "
+        f"estimated load time {estimate['estimated_seconds']:.1f} seconds with one worker")
+    print(msg)
+    logger.logEvent('Info', msg)
+    return estimate
+
+
+def runJob(spec):
+    '''This method runs one load job and returns a summary of it, or None if the spec is invalid or the dry run failed'''
+    logger.initializeLogger(LOGGER_FILE_LOC, 'a+', LOG_LEVEL, LOG_FORMAT, LOG_ASYNC)
+    job = getJobSpec(spec)
+    if job is None:
+        return None
+    helpers.useLoadSettings(job['batch_size'], job['engine'])
+    start_time = perf_counter()
+    try:
+        if isFilePattern(job['file']):
+            if job['dry_run']:
+                logger.logEvent('Error', 'Dry runs estimate single files, not directories or patterns')
+                return None
+            is_load_successful = loadFiles(job['file'], job['workers'], job['header'], job['table'] or TABLE_NAME)
+            return {'file': job['file'], 'table': job['table'], 'successful': is_load_successful, 'seconds': perf_counter() - start_time}
+        if PARTITION_COLUMN and job['table']:
+            logger.logEvent('Warning', f"Partitioned tables are named after their file, ignoring table {job['table']}")
+            job['table'] = None
+        helpers.useInputFile(job['file'], job['table'])
+        if job['dry_run']:
+            return estimateJob(job)
+        is_load_successful = loadSingleFile(job)
+        return {
+            'file': job['file'],
+            'table': helpers.getTableName(),
+            'successful': bool(is_load_successful),
+            'entries': helpers.file_reader.no_of_entries,
+            'seconds': perf_counter() - start_time,
+            'table_size': helpers.getTableSize()
+        }
+    except Exception as e:
+        logger.logEvent('Error', f"Error while running job for {job['file']}: {e}")
+        return {'file': job['file'], 'table': job['table'], 'successful': False, 'seconds': perf_counter() - start_time}
+    finally:
+        helpers.finishJob()
+
+
+def runJobs(specs):
+    '''This method runs the jobs one after another in this process, reusing its connection pool, and returns their summaries'''
+    results = []
+    for spec in specs:
+        result = runJob(spec)
+        results.append(result)
+        if result is None or not result.get('successful', True):
+            logger.logEvent('Warning', f"Job for {spec.get('file')} did not complete")
+    return results
\ No newline at end of file
@@ -1,11 +1,24 @@
 '''This file contains the Logger class'''
+import json
+import atexit
+from time import time
 from datetime import datetime
+from queue import SimpleQueue
+from threading import Thread
+
+LOG_LEVELS = {'Debug': 10, 'Info': 20, 'Event': 20, 'Warning': 30, 'Error': 40}
 
 
 class Logger():
     '''This class contains methods for logging events'''
     _instance = None
     logger = None
+    level = LOG_LEVELS['Info']
+    log_format = 'text'
+    records = None
+    writer = None
+    # most records written by the background thread in a single write
+    block_size = 1000
     
     
     def __new__(cls):
@@ -15,29 +28,71 @@ class Logger():
         return cls._instance
     
     
-    def initializeLogger(self, logger_file_path, mode):
-        '''This method opens the logger file'''
+    def initializeLogger(self, logger_file_path, mode, level='Info', log_format='text', is_async=False):
+        '''This method opens the logger file, optionally writing records from a background thread'''
         try:
             if not self.logger:
-                self.logger = open(logger_file_path, mode=mode)
+                self.logger = open(logger_file_path, mode=mode, buffering=1 << 16)
+                self.level = LOG_LEVELS.get(level.capitalize(), LOG_LEVELS['Info'])
+                self.log_format = log_format
+                if is_async:
+                    self.records = SimpleQueue()
+                    self.writer = Thread(target=self.writeRecords, daemon=True)
+                    self.writer.start()
+                    atexit.register(self.closeLogger)
         except Exception as e:
             print(f'Error while initializing logger: {e}')
     
     
-    def logEvent(self, log_type, msg):
-        '''This method logs an event into the file'''
+    def formatRecord(self, timestamp, log_type, msg, fields):
+        '''This method formats a record as a text line or a JSON line'''
+        if self.log_format == 'json':
+            return json.dumps({'time': datetime.fromtimestamp(timestamp).isoformat(), 'level': log_type, 'msg': msg, **fields}, default=str) + '\n'
+        if fields:
+            msg += ' | ' + ' '.join(f'{key}={value}' for key, value in fields.items())
+        return f"{datetime.fromtimestamp(timestamp)} - {log_type}: {msg}\n"
+    
+    
+    def logEvent(self, log_type, msg, **fields):
+        '''This method logs an event into the file, skipping it cheaply if it is below the log level'''
         try:
-            if self.logger:
-                self.logger.write(f"{datetime.now()} - {log_type}: {msg}\n")
+            if LOG_LEVELS.get(log_type, LOG_LEVELS['Info']) < self.level:
+                return
+            if self.records is not None:
+                self.records.put((time(), log_type, msg, fields))
+            elif self.logger:
+                self.logger.write(self.formatRecord(time(), log_type, msg, fields))
             else:
                 print('Logger file has not been initialized')
         except Exception as e:
             print(f'Error while logging event {msg} of type {log_type}: {e}')
     
     
+    def writeRecords(self):
+        '''This method writes queued records in blocks until the closing sentinel is queued'''
+        try:
+            is_closing = False
+            while not is_closing:
+                records = [self.records.get()]
+                while len(records) < self.block_size and not self.records.empty():
+                    records.append(self.records.get())
+                if None in records:
+                    is_closing = True
+                    records = records[:records.index(None)]
+                self.logger.write(''.join(self.formatRecord(*record) for record in records))
+            self.logger.flush()
+        except Exception as e:
+            print(f'Error while writing log records: {e}')
+    
+    
     def closeLogger(self):
-        '''This method closes the logger file'''
+        '''This method flushes pending records and closes the logger file'''
         try:
+            if self.writer:
+                self.records.put(None)
+                self.writer.join()
+                self.writer = None
+                self.records = None
             if self.logger:
                 self.logger.close()
                 self.logger = None
@@ -0,0 +1,202 @@
+'''This file contains the Metrics class'''
+import json
+from os import replace
+from time import perf_counter, time
+from threading import Thread, Lock, Event
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from logger_class import Logger
+
+STAGES = ('read', 'parse', 'encode', 'network', 'commit')
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    '''Class answering metrics requests in the Prometheus text format'''
+    
+    
+    def do_GET(self):
+        '''This method returns the metrics of the Metrics singleton'''
+        body = Metrics().formatPrometheus().encode('utf-8')
+        self.send_response(200 if self.path in ('/', '/metrics') else 404)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    
+    def log_message(self, *args):
+        '''This method keeps requests out of stderr'''
+        return
+    
+    
+class Metrics:
+    '''Class collecting load metrics per batch and exposing them as a progress line, an HTTP endpoint and a stats file'''
+    _instance = None
+    lock = Lock()
+    total_rows = 0
+    start_rows = 0
+    rows = 0
+    no_of_bytes = 0
+    batches = 0
+    retries = 0
+    stage_times = None
+    start_time = None
+    last_progress_time = 0.0
+    progress_interval = 5.0
+    server = None
+    writer = None
+    stop_event = None
+    stats_file_path = None
+    logger = Logger()
+    
+    
+    def __new__(cls):
+        '''This method overrides new to make it a singleton'''
+        if not cls._instance:
+            cls._instance = super(Metrics, cls).__new__(cls)
+            cls._instance.stage_times = dict.fromkeys(STAGES, 0.0)
+        return cls._instance
+    
+    
+    def startLoad(self, total_rows, start_rows=0, progress_interval=5.0):
+        '''This method starts measuring a load of total_rows entries of which start_rows are already loaded'''
+        with self.lock:
+            self.total_rows = total_rows
+            self.start_rows = start_rows
+            self.rows = 0
+            self.no_of_bytes = 0
+            self.batches = 0
+            self.retries = 0
+            self.stage_times = dict.fromkeys(STAGES, 0.0)
+            self.progress_interval = progress_interval
+            self.start_time = perf_counter()
+            self.last_progress_time = self.start_time
+    
+    
+    def addStageTime(self, stage, seconds):
+        '''This method adds the time a batch spent in one stage'''
+        with self.lock:
+            self.stage_times[stage] = self.stage_times.get(stage, 0.0) + seconds
+    
+    
+    def recordRetry(self):
+        '''This method counts a retried database operation'''
+        with self.lock:
+            self.retries += 1
+    
+    
+    def recordBatch(self, no_of_rows, no_of_bytes=0):
+        '''This method counts a committed batch and prints the progress line if it is due'''
+        with self.lock:
+            self.rows += no_of_rows
+            self.no_of_bytes += max(0, no_of_bytes)
+            self.batches += 1
+            now = perf_counter()
+            is_progress_due = self.start_time is not None and now - self.last_progress_time >= self.progress_interval
+            if is_progress_due:
+                self.last_progress_time = now
+        if is_progress_due:
+            print(self.formatProgress())
+    
+    
+    def getSnapshot(self):
+        '''This method returns the current metrics as a dictionary'''
+        with self.lock:
+            elapsed = perf_counter() - self.start_time if self.start_time is not None else 0.0
+            rows_per_second = self.rows / elapsed if elapsed else 0.0
+            loaded_rows = self.start_rows + self.rows
+            remaining_rows = max(0, self.total_rows - loaded_rows)
+            return {
+                'time': time(),
+                'elapsed_seconds': elapsed,
+                'rows_loaded': loaded_rows,
+                'rows_total': self.total_rows,
+                'progress': loaded_rows / self.total_rows if self.total_rows else 0.0,
+                'rows_per_second': rows_per_second,
+                'bytes_loaded': self.no_of_bytes,
+                'bytes_per_second': self.no_of_bytes / elapsed if elapsed else 0.0,
+                'batches': self.batches,
+                'retries': self.retries,
+                'eta_seconds': remaining_rows / rows_per_second if rows_per_second and self.total_rows else None,
+                'stage_seconds': dict(self.stage_times)
+            }
+    
+    
+    def formatProgress(self):
+        '''This method returns a compact one line summary of the load'''
+        snapshot = self.getSnapshot()
+        stage_total = sum(snapshot['stage_seconds'].values()) or 1.0
+        stages = ' '.join(f'{stage} {seconds * 100 / stage_total:.0f}%' for stage, seconds in snapshot['stage_seconds'].items() if seconds)
+        eta = snapshot['eta_seconds']
+        eta = f'{int(eta // 60)}m{int(eta % 60):02d}s' if eta is not None else '-'
+        return (f"[{snapshot['progress'] * 100:5.1f}%] {snapshot['rows_loaded']:,}/{snapshot['rows_total']:,} rows | "
+            f"{snapshot['rows_per_second']:,.0f} rows/s | {snapshot['bytes_per_second'] / 1048576:.1f} MB/s | "
+            f"ETA {eta} | retries {snapshot['retries']} | {stages}")
+    
+    
+    def formatPrometheus(self):
+        '''This method returns the metrics in the Prometheus text format'''
+        snapshot = self.getSnapshot()
+        lines = [
+            '# TYPE dbtodb_rows_loaded_total counter', f"dbtodb_rows_loaded_total {snapshot['rows_loaded']}",
+            '# TYPE dbtodb_rows_total gauge', f"dbtodb_rows_total {snapshot['rows_total']}",
+            '# TYPE dbtodb_bytes_loaded_total counter', f"dbtodb_bytes_loaded_total {snapshot['bytes_loaded']}",
+            '# TYPE dbtodb_batches_total counter', f"dbtodb_batches_total {snapshot['batches']}",
+            '# TYPE dbtodb_retries_total counter', f"dbtodb_retries_total {snapshot['retries']}",
+            '# TYPE dbtodb_rows_per_second gauge', f"dbtodb_rows_per_second {snapshot['rows_per_second']}",
+            '# TYPE dbtodb_bytes_per_second gauge', f"dbtodb_bytes_per_second {snapshot['bytes_per_second']}",
+            '# TYPE dbtodb_eta_seconds gauge', f"dbtodb_eta_seconds {snapshot['eta_seconds'] if snapshot['eta_seconds'] is not None else 'NaN'}",
+            '# TYPE dbtodb_stage_seconds_total counter'
+        ]
+        lines += [f'dbtodb_stage_seconds_total{{stage="{stage}"}} {seconds}' for stage, seconds in snapshot['stage_seconds'].items()]
+        return '\n'.join(lines) + '\n'
+    
+    
+    def startServer(self, port):
+        '''This method serves the metrics on localhost at /metrics from a background thread unless they are served already'''
+        if self.server:
+            return
+        try:
+            self.server = ThreadingHTTPServer(('127.0.0.1', port), MetricsHandler)
+            Thread(target=self.server.serve_forever, daemon=True).start()
+            self.logger.logEvent('Info', f'Serving metrics on http://127.0.0.1:{port}/metrics')
+        except OSError as ose:
+            self.logger.logEvent('Error', f'Could not serve metrics on port {port}: {ose}')
+    
+    
+    def writeStatsFile(self):
+        '''This method replaces the stats file with the current metrics, so readers never see a partial file'''
+        try:
+            with open(self.stats_file_path + '.tmp', mode='w') as stats_file:
+                json.dump(self.getSnapshot(), stats_file)
+            replace(self.stats_file_path + '.tmp', self.stats_file_path)
+        except Exception as e:
+            self.logger.logEvent('Warning', f'Could not write stats file {self.stats_file_path}: {e}')
+    
+    
+    def writeStatsPeriodically(self, interval):
+        '''This method runs in a background thread, writing the stats file every interval seconds until stopped'''
+        while not self.stop_event.wait(interval):
+            self.writeStatsFile()
+    
+    
+    def startStatsFile(self, stats_file_path, interval):
+        '''This method starts writing the stats file every interval seconds unless it is written already'''
+        if self.writer:
+            return
+        self.stats_file_path = stats_file_path
+        self.stop_event = Event()
+        self.writer = Thread(target=self.writeStatsPeriodically, args=(interval,), daemon=True)
+        self.writer.start()
+    
+    
+    def stop(self):
+        '''This method stops serving metrics and writes the final stats file'''
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+        if self.writer:
+            self.stop_event.set()
+            self.writer.join()
+            self.writer = None
+            self.writeStatsFile()
\ No newline at end of file
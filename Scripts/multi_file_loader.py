@@ -0,0 +1,101 @@
+'''This file contains methods for loading the files of a directory or glob pattern across worker processes'''
+import glob
+from os import path
+from time import perf_counter
+from multiprocessing import get_context
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from logger_class import Logger
+from metrics_class import Metrics
+from functools import partial
+from config import TABLE_NAME, MULTI_FILE_TABLE, TABLE_MODE, HAS_HEADER
+import helpers
+
+logger = Logger()
+metrics = Metrics()
+SKIPPED_SUFFIXES = ('.idx',)
+
+
+def findInputFiles(file_pattern):
+    '''This method returns the files matching the directory or glob pattern, largest first'''
+    if path.isdir(file_pattern):
+        file_pattern = path.join(file_pattern, '*')
+    files = [
+        file_path for file_path in glob.glob(file_pattern)
+        if path.isfile(file_path) and not file_path.endswith(SKIPPED_SUFFIXES) and not path.basename(file_path).startswith('.')
+    ]
+    return sorted(files, key=path.getsize, reverse=True)
+
+
+def getTargetTable(file_path, shared_table=TABLE_NAME):
+    '''This method returns the table the file is loaded into, its own or the shared one'''
+    if MULTI_FILE_TABLE == 'shared':
+        return shared_table
+    return helpers.getTableNameFromFile(path.basename(file_path))
+
+
+def loadFile(file_path, table_name, is_shared, has_header, batch_size=None, load_engine=None):
+    '''This method loads one file in a worker process and returns its path, table, entries and duration'''
+    start = perf_counter()
+    try:
+        helpers.useInputFile(file_path, table_name, is_shared)
+        helpers.useLoadSettings(batch_size, load_engine)
+        return file_path, table_name, helpers.loadInputFile(has_header), perf_counter() - start
+    finally:
+        helpers.shutdown()
+
+
+def scheduleFiles(files, getTable, is_shared, has_header, workers):
+    '''This method loads the files in the given order across worker processes and returns whether all of them got loaded'''
+    is_load_successful = True
+    # rows are only counted here once a whole file is loaded by a worker
+    metrics.startLoad(0, 0, 0)
+    with ProcessPoolExecutor(max_workers=max(1, min(workers, len(files))), mp_context=get_context('spawn')) as executor:
+        futures = [
+            executor.submit(loadFile, file_path, getTable(file_path), is_shared, has_header, helpers.load_batch_size, helpers.load_engine)
+            for file_path in files
+        ]
+        for future in as_completed(futures):
+            try:
+                file_path, table_name, entries, duration = future.result()
+            except Exception as e:
+                logger.logEvent('Error', f'Worker failed while loading a file: {e}')
+                is_load_successful = False
+                continue
+            if entries == -1:
+                msg = f'Loading {file_path} failed after {duration} seconds, it will be resumed on the next run'
+                is_load_successful = False
+            else:
+                metrics.recordBatch(entries, path.getsize(file_path))
+                msg = f'Loaded {entries} entries of {file_path} into {table_name} in {duration} seconds'
+            print(msg)
+            logger.logEvent('Info' if entries != -1 else 'Error', msg)
+    return is_load_successful
+
+
+def loadFiles(file_pattern, workers, header=HAS_HEADER, shared_table=TABLE_NAME):
+    '''This method loads the files that are not in the manifest yet, scheduling the largest ones first'''
+    files = findInputFiles(file_pattern)
+    if not files:
+        msg = f'No files match {file_pattern}'
+        print(msg)
+        logger.logEvent('Error', msg)
+        return False
+    if MULTI_FILE_TABLE == 'shared' and not shared_table:
+        logger.logEvent('Error', 'Loading into a shared table needs TRADE_TABLE to be set')
+        return False
+    if MULTI_FILE_TABLE == 'shared' and TABLE_MODE == 'staging':
+        logger.logEvent('Warning', 'A shared table cannot be swapped in from a staging table, loading it directly')
+    getTable = partial(getTargetTable, shared_table=shared_table)
+    pending_files = helpers.getPendingFiles(files, getTable)
+    if pending_files is None:
+        return False
+    print(f'{len(files)} files found, {len(files) - len(pending_files)} already loaded')
+    if not pending_files:
+        return True
+    # with auto detection every worker sniffs the header of its own file
+    has_header = None
+    if header == 'ask':
+        has_header = input(f'Do the files have header?[y/n]: ').lower() == 'y'
+    elif header != 'auto':
+        has_header = header in ('y', 'yes', 'true', '1')
+    return scheduleFiles(pending_files, getTable, MULTI_FILE_TABLE == 'shared', has_header, workers)
\ No newline at end of file
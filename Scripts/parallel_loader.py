@@ -0,0 +1,161 @@
+'''This file contains methods for loading the file in parallel byte ranges'''
+import csv
+from io import StringIO
+from os import path
+from time import perf_counter
+from multiprocessing import get_context
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from logger_class import Logger
+from metrics_class import Metrics
+from db_class import DBConnection
+from table_operations_class import TableOperations, RANGE_KEY_SEPARATOR
+from config import LOGGER_FILE_LOC, LOG_LEVEL, LOG_FORMAT, LOG_ASYNC, BATCH_SIZE, LOAD_ENGINE
+
+logger = Logger()
+metrics = Metrics()
+MAX_RANGE_RETRIES = 3
+
+
+def splitFileIntoRanges(file_path, no_of_ranges, has_header):
+    '''This method splits the file into newline aligned byte ranges'''
+    file_size = path.getsize(file_path)
+    with open(file_path, mode='rb') as file_object:
+        if has_header:
+            file_object.readline()
+        data_start = file_object.tell()
+        boundaries = [data_start]
+        for i in range(1, no_of_ranges):
+            file_object.seek(data_start + (file_size - data_start) * i // no_of_ranges)
+            file_object.readline()
+            offset = file_object.tell()
+            if boundaries[-1] < offset < file_size:
+                boundaries.append(offset)
+    boundaries.append(file_size)
+    return [(boundaries[i], boundaries[i + 1]) for i in range(len(boundaries) - 1) if boundaries[i] < boundaries[i + 1]]
+
+
+def loadRange(range_id, start, end, start_rows, file_path, queries, progress_queue):
+    '''This method loads the lines of one byte range using its own DB connection, checkpointing the range with every batch'''
+    logger.initializeLogger(LOGGER_FILE_LOC, 'a+', LOG_LEVEL, LOG_FORMAT, LOG_ASYNC)
+    db_connection = DBConnection()
+    table_operations = TableOperations()
+    rows = 0
+    range_key = queries['checkpoint_key'] + RANGE_KEY_SEPARATOR + str(range_id)
+    try:
+        db_connection.dbConnect()
+        table_operations.setDatabaseAndCursor(db_connection)
+        table_operations.setInsertQuery(queries['insert'])
+        table_operations.setCopyQuery(queries['copy'], queries['copy_format'], queries['encoding'], queries['csv_dialect'])
+        if queries['column_types']:
+            table_operations.setColumnTypes(queries['column_types'])
+        table_operations.setUpsertQueries(queries['upsert'])
+        table_operations.setCheckpointTable(queries['checkpoint_table'])
+        with open(file_path, mode='rb') as file_object:
+            file_object.seek(start)
+            offset = start
+            while offset < end:
+                stage_times = dict(metrics.stage_times)
+                retries = metrics.retries
+                stage_start = perf_counter()
+                lines = []
+                while len(lines) < queries.get('batch_size', BATCH_SIZE) and offset < end:
+                    line = file_object.readline()
+                    if not line:
+                        break
+                    offset += len(line)
+                    lines.append(line)
+                if not lines:
+                    break
+                block = b''.join(lines)
+                metrics.addStageTime('read', perf_counter() - stage_start)
+                table_operations.setCheckpoint(range_key, queries['file_identity'], range_id, offset, start_rows + rows + len(lines), None, end)
+                if queries['reader_mode'] != 'raw':
+                    block = block.decode(queries['encoding'])
+                if queries.get('load_engine', LOAD_ENGINE) == 'copy':
+                    is_insertion_successful = table_operations.copyRows(block, len(lines))
+                else:
+                    stage_start = perf_counter()
+                    text = block.decode(queries['encoding']) if isinstance(block, bytes) else block
+                    # parsed like the csv reader of FileReader, so quoted delimiters and newlines and the dialect are honoured in every reader mode
+                    entries = list(csv.reader(StringIO(text, newline=''), dialect=queries['csv_dialect']))
+                    metrics.addStageTime('parse', perf_counter() - stage_start)
+                    is_insertion_successful = table_operations.insertRows(entries)
+                if not is_insertion_successful:
+                    logger.logEvent('Error', f'Range {range_id} failed at byte {offset - sum(len(line) for line in lines)}')
+                    return range_id, False, rows
+                rows += len(lines)
+                # the metrics of this process die with it, so the time the batch spent in each stage travels with its progress
+                batch_stage_times = {stage: seconds - stage_times.get(stage, 0.0) for stage, seconds in metrics.stage_times.items()}
+                progress_queue.put((range_id, offset, len(lines), batch_stage_times, metrics.retries - retries))
+        logger.logEvent('Info', f'Range {range_id} loaded {rows} rows')
+        return range_id, True, rows
+    except Exception as e:
+        logger.logEvent('Error', f'Error while loading range {range_id}: {e}')
+        return range_id, False, rows
+    finally:
+        db_connection.closeAllConnections()
+        logger.closeLogger()
+
+
+def drainProgress(progress_queue, ranges):
+    '''This method applies the committed offsets reported by the workers and adds their stage times and retries to the metrics'''
+    while not progress_queue.empty():
+        range_id, offset, rows, stage_times, retries = progress_queue.get()
+        for stage, seconds in stage_times.items():
+            metrics.addStageTime(stage, seconds)
+        for _ in range(retries):
+            metrics.recordRetry()
+        metrics.recordBatch(rows, offset - ranges[range_id]['committed'])
+        ranges[range_id]['committed'] = offset
+        ranges[range_id]['rows'] += rows
+
+
+def loadInParallel(file_path, ranges, queries, workers):
+    '''This method loads the unfinished byte ranges across worker processes from their committed offsets, retrying only the ranges that fail'''
+    try:
+        start_time = perf_counter()
+        ranges = {range_id: dict(current, attempts=0) for range_id, current in ranges.items()}
+        logger.logEvent('Info', f'Loading {file_path} in {len(ranges)} ranges with {workers} workers')
+        context = get_context('spawn')
+        failed_ranges = []
+        with context.Manager() as manager:
+            progress_queue = manager.Queue()
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+                def submitRange(range_id):
+                    current = ranges[range_id]
+                    return executor.submit(loadRange, range_id, current['committed'], current['end'], current['rows'], file_path, queries, progress_queue)
+                futures = {submitRange(range_id): range_id for range_id, current in ranges.items() if current['committed'] < current['end']}
+                while futures:
+                    done, _ = wait(futures, timeout=1, return_when=FIRST_COMPLETED)
+                    drainProgress(progress_queue, ranges)
+                    for future in done:
+                        range_id = futures.pop(future)
+                        current = ranges[range_id]
+                        try:
+                            is_range_successful = future.result()[1]
+                        except Exception as e:
+                            logger.logEvent('Error', f'Worker for range {range_id} crashed: {e}')
+                            is_range_successful = False
+                        if is_range_successful:
+                            msg = f'Range {range_id + 1}/{len(ranges)} completed with {current["rows"]} rows'
+                            print(msg)
+                            logger.logEvent('Info', msg)
+                        elif current['attempts'] < MAX_RANGE_RETRIES:
+                            current['attempts'] += 1
+                            msg = f'Range {range_id + 1} failed, retrying from byte {current["committed"]} (attempt {current["attempts"]})'
+                            print(msg)
+                            logger.logEvent('Warning', msg)
+                            futures[submitRange(range_id)] = range_id
+                        else:
+                            failed_ranges.append(range_id)
+                            logger.logEvent('Error', f'Range {range_id + 1} failed after {MAX_RANGE_RETRIES} retries')
+            drainProgress(progress_queue, ranges)
+        total_rows = sum(current['rows'] for current in ranges.values())
+        logger.logEvent('Info', f'Parallel load of {total_rows} rows finished in {perf_counter() - start_time} seconds')
+        if failed_ranges:
+            print(f'Ranges {[range_id + 1 for range_id in failed_ranges]} could not be loaded')
+            return False
+        return True
+    except Exception as e:
+        logger.logEvent('Error', f'Error during parallel load: {e}')
+        return False
\ No newline at end of file
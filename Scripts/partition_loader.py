@@ -0,0 +1,139 @@
+'''This file contains methods for routing rows into monthly range partitions and loading the partitions in parallel'''
+import re
+import csv
+import json
+from os import path, makedirs
+from time import perf_counter
+from logger_class import Logger
+from compressed_file import openFile
+from multi_file_loader import scheduleFiles
+from config import PARTITION_SPOOL_DIR, RELOAD_PARTITIONS, CSV_DIALECT, FILE_ENCODING
+import helpers
+
+logger = Logger()
+DEFAULT_PARTITION = 'default'
+SPOOL_BUFFER_SIZE = 1 << 20
+# value formats of the partition column and how their month ranges are written
+MONTH_FORMATS = (
+    (re.compile(rb'^(\d{4})(\d{2})$'), '{0:04d}{1:02d}'),
+    (re.compile(rb'^(\d{4})-(\d{2})$'), '{0:04d}-{1:02d}'),
+    (re.compile(rb'^(\d{4})-(\d{2})-\d{2}$'), '{0:04d}-{1:02d}-01')
+)
+
+
+def getPartitionBounds(value):
+    '''This method returns the month key of the value and the range of its partition, written like the value'''
+    value = value.strip().strip(b'"')
+    for pattern, bound_format in MONTH_FORMATS:
+        match = pattern.match(value)
+        if match:
+            year, month = int(match.group(1)), int(match.group(2))
+            if not 1 <= month <= 12:
+                break
+            next_year, next_month = (year + 1, 1) if month == 12 else (year, month + 1)
+            return f'{year:04d}{month:02d}', (bound_format.format(year, month), bound_format.format(next_year, next_month))
+    return DEFAULT_PARTITION, None
+
+
+def getPartitionTable(parent_table, key):
+    '''This method returns the name of the partition holding the given month key'''
+    if key == DEFAULT_PARTITION:
+        return f'{parent_table}_{DEFAULT_PARTITION}'
+    return f'{parent_table}_p{key}'
+
+
+def getKeyField(line, column_index, delimiter):
+    '''This method returns the partition column of a raw line, only parsing it as csv if it has quotes'''
+    if b'"' in line:
+        return next(csv.reader([line.decode(FILE_ENCODING)], dialect=CSV_DIALECT))[column_index].encode(FILE_ENCODING)
+    return line.split(delimiter, column_index + 1)[column_index]
+
+
+def spoolPartitions(file_path, has_header, column_index, parent_table, table_operations):
+    '''This method routes every line into the spool file of its partition, creating partitions as new months show up'''
+    makedirs(PARTITION_SPOOL_DIR, exist_ok=True)
+    delimiter = csv.get_dialect(CSV_DIALECT).delimiter.encode(FILE_ENCODING)
+    keys = {}
+    spool_files = {}
+    partitions = {}
+    start = perf_counter()
+    try:
+        with openFile(file_path, mode='rb') as source:
+            if has_header:
+                source.readline()
+            for line in source:
+                try:
+                    value = getKeyField(line, column_index, delimiter)
+                except IndexError:
+                    value = b''
+                if value not in keys:
+                    keys[value] = getPartitionBounds(value)
+                key, bounds = keys[value]
+                spool_file = spool_files.get(key)
+                if spool_file is None:
+                    partition_table = getPartitionTable(parent_table, key)
+                    if not table_operations.createPartition(parent_table, partition_table, bounds):
+                        raise IOError(f'Could not create partition {partition_table}')
+                    spool_path = path.join(PARTITION_SPOOL_DIR, partition_table + '.csv')
+                    spool_file = spool_files[key] = open(spool_path, mode='wb', buffering=SPOOL_BUFFER_SIZE)
+                    partitions[spool_path] = partition_table
+                spool_file.write(line if line.endswith(b'\n') else line + b'\n')
+    finally:
+        for spool_file in spool_files.values():
+            spool_file.close()
+    logger.logEvent('Info', f'Routed {file_path} into {len(partitions)} partitions in {perf_counter() - start} seconds')
+    return partitions
+
+
+def getSpoolMarkerPath(parent_table):
+    '''This method returns the path of the file recording which source the spool files were routed from'''
+    return path.join(PARTITION_SPOOL_DIR, parent_table + '.spool.json')
+
+
+def loadSpoolMarker(parent_table, file_identity):
+    '''This method returns the spooled partitions if they were routed from the same source file'''
+    try:
+        with open(getSpoolMarkerPath(parent_table), mode='r') as marker_file:
+            marker = json.load(marker_file)
+        if marker.get('identity') != file_identity or not all(path.exists(spool_path) for spool_path in marker['partitions']):
+            logger.logEvent('Info', f'Spooled partitions of {parent_table} are stale')
+            return None
+        return marker['partitions']
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.logEvent('Warning', f'Could not read spool marker of {parent_table} - {e}')
+        return None
+
+
+def loadPartitioned(workers):
+    '''This method routes the input file into partitions, then loads the partitions that aren't in the manifest in parallel'''
+    try:
+        file_reader = helpers.file_reader
+        table_operations = helpers.table_operations
+        parent_table = helpers.getLoadTableName()
+        partitions = loadSpoolMarker(parent_table, file_reader.file_identity)
+        if partitions:
+            print(f'Reusing {len(partitions)} spooled partitions')
+        else:
+            print('Routing rows into partitions')
+            partitions = spoolPartitions(file_reader.file_path, file_reader.has_header, helpers.partition_column_index, parent_table, table_operations)
+            with open(getSpoolMarkerPath(parent_table), mode='w') as marker_file:
+                json.dump({'identity': file_reader.file_identity, 'partitions': partitions}, marker_file)
+        table_operations.createManifestTable()
+        for key in RELOAD_PARTITIONS:
+            partition_table = getPartitionTable(parent_table, str(key))
+            table_operations.truncateTable(partition_table)
+            table_operations.deleteCheckpoint(partition_table)
+            table_operations.deleteManifestEntry(partition_table + '.csv', partition_table)
+        files = sorted(partitions, key=path.getsize, reverse=True)
+        pending_files = helpers.getPendingFiles(files, partitions.get)
+        if pending_files is None:
+            return False
+        print(f'{len(files)} partitions, {len(files) - len(pending_files)} already loaded')
+        if not pending_files:
+            return True
+        return scheduleFiles(pending_files, partitions.get, False, False, workers)
+    except Exception as e:
+        logger.logEvent('Error', f'Error during partitioned load: {e}')
+        return False
\ No newline at end of file
@@ -0,0 +1,105 @@
+'''This file contains methods for loading batches through a pipelined reader and loader'''
+from threading import Thread, Event
+from queue import Queue, Full
+from time import perf_counter
+from logger_class import Logger
+from metrics_class import Metrics
+from config import BATCH_SIZE, LOAD_ENGINE, PREFETCH_BATCHES
+
+logger = Logger()
+metrics = Metrics()
+END_OF_BATCHES = None
+
+
+def putUntilStopped(batch_queue, item, stop_event):
+    '''This method puts the item into the queue unless the pipeline gets stopped while waiting'''
+    while not stop_event.is_set():
+        try:
+            batch_queue.put(item, timeout=0.5)
+            return True
+        except Full:
+            continue
+    return False
+
+
+def readBatches(file_reader, table_operations, start, sizer, batch_queue, stop_event, stats, batch_size=BATCH_SIZE, load_engine=LOAD_ENGINE):
+    '''This method reads and encodes batches into the queue until the last entry or a stop'''
+    try:
+        curr_batch = start
+        while file_reader.current_entry < file_reader.no_of_entries:
+            if stop_event.is_set():
+                return
+            read_start = perf_counter()
+            next_size = sizer.nextSize() if sizer else batch_size
+            no_of_lines = min(next_size, file_reader.no_of_entries - file_reader.current_entry)
+            batch_offset = file_reader.getOffset()
+            if load_engine == 'copy':
+                payload = table_operations.encodeBlock(file_reader.getRawLines(no_of_lines))
+            else:
+                payload = file_reader.getLines(no_of_lines)
+            offset = file_reader.getOffset()
+            item = (curr_batch, payload, no_of_lines, offset, file_reader.current_entry, next_size, offset - batch_offset)
+            curr_batch += 1
+            stats['read'] += perf_counter() - read_start
+            stall_start = perf_counter()
+            if not putUntilStopped(batch_queue, item, stop_event):
+                return
+            stats['reader_stall'] += perf_counter() - stall_start
+    except Exception as e:
+        logger.logEvent('Error', f'Error in pipeline reader: {e}')
+        stats['reader_failed'] = True
+    finally:
+        putUntilStopped(batch_queue, END_OF_BATCHES, stop_event)
+
+
+def loadPipelined(file_reader, table_operations, checkpoint_key, start, sizer=None, batch_size=BATCH_SIZE, load_engine=LOAD_ENGINE):
+    '''This method loads batches while the next ones are read in a separate thread, sized by the sizer if given'''
+    batch_queue = Queue(maxsize=PREFETCH_BATCHES)
+    stop_event = Event()
+    stats = {'read': 0.0, 'reader_stall': 0.0, 'load': 0.0, 'loader_stall': 0.0, 'reader_failed': False}
+    reader = Thread(
+        target=readBatches,
+        args=(file_reader, table_operations, start, sizer, batch_queue, stop_event, stats, batch_size, load_engine),
+        daemon=True
+    )
+    is_load_successful = True
+    reader.start()
+    try:
+        while True:
+            stall_start = perf_counter()
+            item = batch_queue.get()
+            stats['loader_stall'] += perf_counter() - stall_start
+            if item is END_OF_BATCHES:
+                break
+            curr_batch, payload, no_of_lines, offset, row_count, next_size, no_of_bytes = item
+            batch_start_time = perf_counter()
+            table_operations.setCheckpoint(checkpoint_key, file_reader.file_identity, curr_batch, offset, row_count, next_size)
+            if load_engine == 'copy':
+                is_insertion_successful = table_operations.copyRows(payload, no_of_lines, is_encoded=True)
+            else:
+                is_insertion_successful = table_operations.insertRows(payload)
+            stats['load'] += perf_counter() - batch_start_time
+            if sizer and is_insertion_successful:
+                sizer.recordBatch(no_of_lines, table_operations.commit_latency, no_of_bytes)
+            if not is_insertion_successful:
+                msg = f'Batch {curr_batch + 1} failed after {perf_counter() - batch_start_time} seconds. Stopping pipeline'
+                print(msg)
+                logger.logEvent('Error', msg)
+                is_load_successful = False
+                break
+            metrics.recordBatch(no_of_lines, no_of_bytes)
+            duration = perf_counter() - batch_start_time
+            msg = f'Batch {curr_batch + 1} completed in {duration} seconds'
+            print(msg)
+            logger.logEvent('Info', msg, batch=curr_batch + 1, rows=no_of_lines, duration=duration)
+    finally:
+        stop_event.set()
+        reader.join()
+    bottleneck = 'load' if stats['reader_stall'] > stats['loader_stall'] else 'read'
+    msg = (f"Pipeline stages - read: {stats['read']:.2f}s (stalled {stats['reader_stall']:.2f}s), "
+        f"load: {stats['load']:.2f}s (stalled {stats['loader_stall']:.2f}s), bottleneck: {bottleneck}")
+    print(msg)
+    logger.logEvent('Info', msg)
+    if sizer:
+        logger.logEvent('Info', f'Adaptive batch sizes: {sizer.getSummary()}')
+    return is_load_successful and not stats['reader_failed']
\ No newline at end of file
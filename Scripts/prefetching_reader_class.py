@@ -0,0 +1,124 @@
+'''This file contains the PrefetchingReader class'''
+import io
+from queue import Queue, Full
+from threading import Thread, Event
+
+
+class PrefetchingReader(io.RawIOBase):
+    '''Class reading a decompressed stream in a background thread, keeping a few chunks ahead of the parser'''
+    chunk_size = 1 << 20
+    prefetch_chunks = 8
+    
+    
+    def __init__(self, opener):
+        '''This method starts decompressing the stream returned by opener from its beginning'''
+        super().__init__()
+        self.opener = opener
+        self.thread = None
+        self.startDecompressing(0)
+    
+    
+    def startDecompressing(self, skip):
+        '''This method (re)opens the stream and decompresses it from the given uncompressed position'''
+        self.stopDecompressing()
+        self.position = skip
+        self.pending = memoryview(b'')
+        self.is_eof = False
+        self.error = None
+        self.chunks = Queue(maxsize=self.prefetch_chunks)
+        self.stop_event = Event()
+        self.thread = Thread(target=self.decompress, args=(self.opener(), skip, self.chunks, self.stop_event), daemon=True)
+        self.thread.start()
+    
+    
+    def stopDecompressing(self):
+        '''This method stops the background thread if it is running'''
+        if self.thread:
+            self.stop_event.set()
+            self.thread.join()
+            self.thread = None
+    
+    
+    def putChunk(self, chunks, chunk, stop_event):
+        '''This method queues a chunk unless the reader gets stopped while waiting'''
+        while not stop_event.is_set():
+            try:
+                chunks.put(chunk, timeout=0.5)
+                return True
+            except Full:
+                continue
+        return False
+    
+    
+    def decompress(self, stream, skip, chunks, stop_event):
+        '''This method runs in the background thread, skipping to the start position and queueing chunks'''
+        try:
+            while skip > 0 and not stop_event.is_set():
+                data = stream.read(min(self.chunk_size, skip))
+                if not data:
+                    break
+                skip -= len(data)
+            while not stop_event.is_set():
+                data = stream.read(self.chunk_size)
+                if not self.putChunk(chunks, data, stop_event) or not data:
+                    return
+        except Exception as e:
+            self.error = e
+            self.putChunk(chunks, b'', stop_event)
+        finally:
+            stream.close()
+    
+    
+    def readable(self):
+        '''This method tells io that the stream can be read'''
+        return True
+    
+    
+    def seekable(self):
+        '''This method tells io that the stream can be positioned'''
+        return True
+    
+    
+    def readinto(self, buffer):
+        '''This method copies the next decompressed bytes into the buffer'''
+        if not self.pending:
+            if self.is_eof:
+                return 0
+            self.pending = memoryview(self.chunks.get())
+            if self.error:
+                raise IOError(f'Error while decompressing - {self.error}')
+            if not self.pending:
+                self.is_eof = True
+                return 0
+        size = min(len(buffer), len(self.pending))
+        buffer[:size] = self.pending[:size]
+        self.pending = self.pending[size:]
+        self.position += size
+        return size
+    
+    
+    def seek(self, offset, whence=io.SEEK_SET):
+        '''This method moves to an uncompressed position, decompressing forward or restarting from the top'''
+        if whence == io.SEEK_CUR:
+            offset += self.position
+        elif whence != io.SEEK_SET:
+            raise io.UnsupportedOperation('Compressed input can only be positioned from the start')
+        if offset < self.position:
+            self.startDecompressing(offset)
+            return self.position
+        scratch = bytearray(self.chunk_size)
+        while self.position < offset:
+            if not self.readinto(memoryview(scratch)[:min(self.chunk_size, offset - self.position)]):
+                break
+        return self.position
+    
+    
+    def tell(self):
+        '''This method returns the current uncompressed position'''
+        return self.position
+    
+    
+    def close(self):
+        '''This method stops the background thread and closes the reader'''
+        self.stopDecompressing()
+        super().close()
\ No newline at end of file
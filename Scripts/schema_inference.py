@@ -0,0 +1,164 @@
+'''This file contains methods for inferring column types and converting fields into typed values'''
+import re
+import csv
+from datetime import date
+from decimal import Decimal
+from struct import pack
+from logger_class import Logger
+from compressed_file import openFile
+
+logger = Logger()
+INTEGER_PATTERN = re.compile(r'^[+-]?\d+$')
+NUMERIC_PATTERN = re.compile(r'^[+-]?(\d+\.\d*|\.\d+|\d+)([eE][+-]?\d+)?$')
+DATE_PATTERN = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+TYPE_RANKS = {'integer': 0, 'bigint': 1, 'numeric': 2}
+SAMPLE_POSITIONS = 20
+HEADER_SAMPLE_LINES = 50
+POSTGRES_EPOCH = date(2000, 1, 1)
+
+
+def getBaseType(column_type):
+    '''This method returns the base type of a column definition such as varchar(6) not null'''
+    base_type = column_type.strip().lower().split('(')[0].split(' ')[0]
+    aliases = {'int': 'integer', 'int4': 'integer', 'int8': 'bigint', 'int2': 'smallint', 'decimal': 'numeric'}
+    return aliases.get(base_type, base_type)
+
+
+def inferValueType(value):
+    '''This method returns the narrowest type of a single field, or None if it is empty'''
+    if value == '':
+        return None
+    if INTEGER_PATTERN.match(value):
+        number = int(value)
+        if -2**31 <= number < 2**31:
+            return 'integer'
+        if -2**63 <= number < 2**63:
+            return 'bigint'
+        return 'numeric'
+    if NUMERIC_PATTERN.match(value):
+        return 'numeric'
+    if DATE_PATTERN.match(value):
+        try:
+            date.fromisoformat(value)
+            return 'date'
+        except ValueError:
+            return 'varchar'
+    return 'varchar'
+
+
+def widenType(current_type, value_type):
+    '''This method returns the type able to hold values of both types'''
+    if current_type is None:
+        return value_type
+    if value_type is None or value_type == current_type:
+        return current_type
+    if current_type in TYPE_RANKS and value_type in TYPE_RANKS:
+        return max(current_type, value_type, key=TYPE_RANKS.get)
+    return 'varchar'
+
+
+def sampleRows(file_path, offsets, has_header, sample_size, encoding='utf-8', csv_dialect='excel'):
+    '''This method reads sample rows from positions spread across the file, parsing them like the file reader does'''
+    positions = offsets[::max(1, len(offsets) // SAMPLE_POSITIONS)] if offsets else [0]
+    lines_per_position = max(1, sample_size // len(positions))
+    rows = []
+    with openFile(file_path, mode='r', encoding=encoding, newline='') as file_object:
+        for offset in positions:
+            file_object.seek(offset)
+            reader = csv.reader(file_object, dialect=csv_dialect)
+            if offset == 0 and has_header:
+                next(reader, None)
+            for _ in range(lines_per_position):
+                row = next(reader, None)
+                if row is None:
+                    break
+                rows.append(row)
+    return rows
+
+
+def inferColumnTypes(file_path, offsets, has_header, no_of_cols, sample_size, encoding='utf-8', csv_dialect='excel'):
+    '''This method samples the file and proposes a type per column'''
+    column_types = [None] * no_of_cols
+    rows = sampleRows(file_path, offsets, has_header, sample_size, encoding, csv_dialect)
+    for row in rows:
+        if len(row) != no_of_cols:
+            continue
+        for i, value in enumerate(row):
+            if column_types[i] != 'varchar':
+                column_types[i] = widenType(column_types[i], inferValueType(value.strip()))
+    column_types = [column_type or 'varchar' for column_type in column_types]
+    logger.logEvent('Info', f'Inferred column types {column_types} from {len(rows)} sampled rows')
+    return column_types
+
+
+def detectHeader(file_path, no_of_lines=HEADER_SAMPLE_LINES, encoding='utf-8', csv_dialect='excel'):
+    '''This method guesses that the first line is a header if one of its fields doesn't fit the type the lines after it give the column'''
+    rows = sampleRows(file_path, [], False, no_of_lines + 1, encoding, csv_dialect)
+    if len(rows) < 2:
+        return False
+    first_row = rows[0]
+    rows = [row for row in rows[1:] if len(row) == len(first_row)]
+    for i, value in enumerate(first_row):
+        column_type = None
+        for row in rows:
+            column_type = widenType(column_type, inferValueType(row[i].strip()))
+        # a column of text tells nothing, names look like any other value there
+        if column_type not in (None, 'varchar') and widenType(column_type, inferValueType(value.strip())) != column_type:
+            return True
+    return False
+
+
+def toNullable(converter):
+    '''This method wraps a converter so that empty fields become None'''
+    return lambda value: converter(value) if value != '' else None
+
+
+def getConverters(column_types):
+    '''This method returns the functions converting fields into python values for the insert engine'''
+    converters = {
+        'smallint': int,
+        'integer': int,
+        'bigint': int,
+        'numeric': Decimal,
+        'date': date.fromisoformat
+    }
+    return [toNullable(converters[base_type]) if base_type in converters else str
+        for base_type in map(getBaseType, column_types)]
+
+
+def encodeNumeric(value):
+    '''This method encodes a decimal string into the PostgreSQL binary numeric format'''
+    sign, digits, exponent = Decimal(value).as_tuple()
+    digits = ''.join(map(str, digits))
+    if exponent >= 0:
+        integer_part, fraction_part = digits + '0' * exponent, ''
+    elif len(digits) + exponent > 0:
+        integer_part, fraction_part = digits[:len(digits) + exponent], digits[len(digits) + exponent:]
+    else:
+        integer_part, fraction_part = '', '0' * -(len(digits) + exponent) + digits
+    scale = len(fraction_part)
+    integer_part = integer_part.zfill((len(integer_part) + 3) // 4 * 4)
+    fraction_part = fraction_part.ljust((len(fraction_part) + 3) // 4 * 4, '0')
+    groups = [int(integer_part[i:i + 4]) for i in range(0, len(integer_part), 4)]
+    weight = len(groups) - 1
+    groups += [int(fraction_part[i:i + 4]) for i in range(0, len(fraction_part), 4)]
+    while groups and groups[0] == 0:
+        groups.pop(0)
+        weight -= 1
+    while groups and groups[-1] == 0:
+        groups.pop()
+    if not groups:
+        weight = 0
+    return pack(f'!hhHH{len(groups)}H', len(groups), weight, 0x4000 if sign else 0, scale, *groups)
+
+
+def getBinaryEncoders(column_types):
+    '''This method returns the functions encoding fields into the COPY binary format, None meaning NULL'''
+    encoders = {
+        'smallint': lambda value: pack('!h', int(value)),
+        'integer': lambda value: pack('!i', int(value)),
+        'bigint': lambda value: pack('!q', int(value)),
+        'numeric': encodeNumeric,
+        'date': lambda value: pack('!i', (date.fromisoformat(value) - POSTGRES_EPOCH).days)
+    }
+    return [toNullable(encoders.get(base_type, lambda value: value.encode('utf-8'))) for base_type in map(getBaseType, column_types)]
\ No newline at end of file
@@ -0,0 +1,231 @@
+'''This file contains methods for exporting tables to csv or parquet files and copying them into another database'''
+import os
+import psycopg2
+from time import perf_counter
+from threading import Thread
+from multiprocessing import get_context
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from logger_class import Logger
+from metrics_class import Metrics
+from db_class import DBConnection
+from table_operations_class import TableOperations
+from compressed_file import openCompressed, FILE_SUFFIXES
+from config import LOGGER_FILE_LOC, LOG_LEVEL, LOG_FORMAT, LOG_ASYNC, WORKERS, SESSION_OPTIONS, EXPORT_DIR, EXPORT_FORMAT, EXPORT_COMPRESSION, EXPORT_FETCH_ROWS, TARGET_DBVARS
+
+logger = Logger()
+metrics = Metrics()
+PIPE_BUFFER_SIZE = 1 << 20
+PARQUET_CODECS = ('snappy', 'gzip', 'zstd')
+# compressions each export format can be written with, none meaning plain csv or snappy parquet
+EXPORT_COMPRESSIONS = {'csv': ('',) + tuple(FILE_SUFFIXES), 'parquet': ('',) + PARQUET_CODECS}
+# arrow types of the postgres type oids that have a direct counterpart, every other type is written as text
+ARROW_TYPE_NAMES = {
+    16: 'bool_',
+    20: 'int64',
+    21: 'int16',
+    23: 'int32',
+    700: 'float32',
+    701: 'float64',
+    1082: 'date32'
+}
+
+
+def getExportPath(export_dir, table_name, export_format, compression):
+    '''This method returns the file a table is exported into'''
+    if export_format == 'parquet':
+        return os.path.join(export_dir, f'{table_name}.parquet')
+    return os.path.join(export_dir, f'{table_name}.csv' + FILE_SUFFIXES.get(compression, ''))
+
+
+def exportCsv(table_operations, table_name, file_path, compression):
+    '''This method streams the table through COPY TO STDOUT into a csv file, compressing it on the way if asked'''
+    with openCompressed(file_path, compression or None) as file_object:
+        return table_operations.copyTableTo(table_name, file_object, ['FORMAT csv', 'HEADER true'])
+
+
+def getArrowSchema(pyarrow, columns):
+    '''This method returns the parquet schema of the columns, as text where the type has no direct counterpart'''
+    return pyarrow.schema([(name, getattr(pyarrow, ARROW_TYPE_NAMES.get(type_code, 'string'))()) for name, type_code in columns])
+
+
+def exportParquet(table_operations, table_name, file_path, compression):
+    '''This method writes the table into a parquet file one row group per fetched chunk, keeping memory flat'''
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        logger.logEvent('Error', 'Exporting parquet needs the pyarrow package')
+        return -1
+    if compression not in PARQUET_CODECS:
+        if compression:
+            logger.logEvent('Warning', f'Parquet has no {compression} codec, using snappy')
+        compression = 'snappy'
+    no_of_rows = 0
+    writer = None
+    try:
+        for columns, rows in table_operations.fetchChunks(table_name, EXPORT_FETCH_ROWS):
+            if writer is None:
+                schema = getArrowSchema(pyarrow, columns)
+                writer = pyarrow.parquet.ParquetWriter(file_path, schema, compression=compression)
+            # an empty table still gets a file with its schema, it just has no row groups
+            if not rows:
+                continue
+            arrays = []
+            for i, field in enumerate(schema):
+                values = [row[i] for row in rows]
+                if field.type == pyarrow.string():
+                    values = [str(value) if value is not None else None for value in values]
+                arrays.append(pyarrow.array(values, type=field.type))
+            writer.write_table(pyarrow.Table.from_arrays(arrays, schema=schema))
+            no_of_rows += len(rows)
+        return no_of_rows
+    except (psycopg2.Error, pyarrow.ArrowException) as e:
+        logger.logEvent('Error', f'Error while exporting table {table_name} to parquet: {e}')
+        return -1
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def connectTarget(target_dbvars):
+    '''This method opens a connection to the target database with the bulk loading session options'''
+    conn = psycopg2.connect(
+        database=target_dbvars['database'],
+        user=target_dbvars['user'],
+        password=target_dbvars['password'],
+        host=target_dbvars['host'],
+        port=target_dbvars['port']
+    )
+    with conn.cursor() as cur:
+        for option, value in SESSION_OPTIONS.items():
+            cur.execute('SELECT set_config(%s, %s, false);', (option, str(value)))
+    conn.commit()
+    return conn
+
+
+def createTargetTable(table_operations, table_name, target_dbvars):
+    '''This method creates the table in the target database with the columns of the source table unless it exists'''
+    columns = table_operations.getColumnDefinitions(table_name)
+    if not columns:
+        return False
+    conn = connectTarget(target_dbvars)
+    try:
+        with conn.cursor() as cur:
+            cur.execute(f'CREATE TABLE IF NOT EXISTS {table_name} (' + ', '.join(f'{name} {column_type}' for name, column_type in columns) + ');')
+        conn.commit()
+        logger.logEvent('Info', f'Created table {table_name} in the target database if it did not exist')
+        return True
+    except psycopg2.Error as pe:
+        logger.logEvent('Error', f'Error while creating table {table_name} in the target database: {pe}')
+        return False
+    finally:
+        conn.close()
+
+
+def copyOutToPipe(table_operations, table_name, pipe_writer, result):
+    '''This method runs in a background thread, copying the table into the write end of the pipe'''
+    try:
+        result['rows'] = table_operations.copyTableTo(table_name, pipe_writer, ['FORMAT binary'])
+    except (OSError, ValueError) as e:
+        logger.logEvent('Error', f'Copying out of {table_name} stopped: {e}')
+        table_operations.database_object.rollback()
+        result['rows'] = -1
+    finally:
+        try:
+            pipe_writer.close()
+        except OSError:
+            # the reader went away, whatever was buffered can't be delivered anymore
+            pass
+
+
+def copyToTarget(table_operations, source_table, target_table, target_dbvars):
+    '''This method pipes COPY TO of the source table straight into COPY FROM of the target table in one transaction'''
+    conn = connectTarget(target_dbvars)
+    read_fd, write_fd = os.pipe()
+    pipe_reader = open(read_fd, mode='rb', buffering=PIPE_BUFFER_SIZE)
+    pipe_writer = open(write_fd, mode='wb', buffering=PIPE_BUFFER_SIZE)
+    result = {'rows': -1}
+    copy_out = Thread(target=copyOutToPipe, args=(table_operations, source_table, pipe_writer, result), daemon=True)
+    try:
+        copy_out.start()
+        with conn.cursor() as cur:
+            cur.copy_expert(f'COPY {target_table} FROM STDIN WITH (FORMAT binary)', pipe_reader)
+        # closing the read end first lets a copy out blocked on a full pipe fail instead of hanging
+        pipe_reader.close()
+        copy_out.join()
+        if result['rows'] == -1:
+            conn.rollback()
+            return -1
+        conn.commit()
+        return result['rows']
+    except psycopg2.Error as pe:
+        logger.logEvent('Error', f'Error while copying {source_table} into {target_table} of the target database: {pe}')
+        conn.rollback()
+        return -1
+    finally:
+        pipe_reader.close()
+        copy_out.join()
+        conn.close()
+
+
+def exportLeafTable(leaf_table, table_name, export_dir, export_format, compression, target_dbvars):
+    '''This method exports one table or partition using its own DB connection and returns it with its rows and duration'''
+    logger.initializeLogger(LOGGER_FILE_LOC, 'a+', LOG_LEVEL, LOG_FORMAT, LOG_ASYNC)
+    db_connection = DBConnection()
+    table_operations = TableOperations()
+    start = perf_counter()
+    try:
+        db_connection.dbConnect()
+        table_operations.setDatabaseAndCursor(db_connection)
+        if target_dbvars:
+            no_of_rows = copyToTarget(table_operations, leaf_table, table_name, target_dbvars)
+        elif export_format == 'parquet':
+            no_of_rows = exportParquet(table_operations, leaf_table, getExportPath(export_dir, leaf_table, export_format, compression), compression)
+        else:
+            no_of_rows = exportCsv(table_operations, leaf_table, getExportPath(export_dir, leaf_table, export_format, compression), compression)
+        return leaf_table, no_of_rows, perf_counter() - start
+    except Exception as e:
+        logger.logEvent('Error', f'Error while exporting {leaf_table}: {e}')
+        return leaf_table, -1, perf_counter() - start
+    finally:
+        db_connection.closeDbConnection()
+
+
+def exportTable(table_name, export_dir=EXPORT_DIR, export_format=EXPORT_FORMAT, compression=EXPORT_COMPRESSION, target_dbvars=TARGET_DBVARS, workers=WORKERS):
+    '''This method exports the table into files or the target database, one partition per worker process at a time'''
+    try:
+        logger.initializeLogger(LOGGER_FILE_LOC, 'a+', LOG_LEVEL, LOG_FORMAT, LOG_ASYNC)
+        db_connection = DBConnection()
+        table_operations = TableOperations()
+        db_connection.dbConnect()
+        table_operations.setDatabaseAndCursor(db_connection)
+        leaf_tables = table_operations.getLeafTables(table_name)
+        if not leaf_tables:
+            return False
+        if target_dbvars:
+            if not createTargetTable(table_operations, table_name, target_dbvars):
+                return False
+        else:
+            os.makedirs(export_dir, exist_ok=True)
+        db_connection.closeDbConnection()
+        metrics.startLoad(0, 0, 0)
+        jobs = [(leaf_table, table_name, export_dir, export_format, compression, target_dbvars) for leaf_table in leaf_tables]
+        if workers <= 1 or len(leaf_tables) == 1:
+            results = [exportLeafTable(*job) for job in jobs]
+        else:
+            with ProcessPoolExecutor(max_workers=min(workers, len(leaf_tables)), mp_context=get_context('spawn')) as executor:
+                results = [future.result() for future in as_completed([executor.submit(exportLeafTable, *job) for job in jobs])]
+        is_export_successful = True
+        for leaf_table, no_of_rows, duration in results:
+            if no_of_rows == -1:
+                msg = f'Exporting {leaf_table} failed after {duration} seconds'
+                is_export_successful = False
+            else:
+                metrics.recordBatch(no_of_rows)
+                msg = f'Exported {no_of_rows} rows of {leaf_table} in {duration} seconds'
+            print(msg)
+            logger.logEvent('Info' if no_of_rows != -1 else 'Error', msg)
+        return is_export_successful
+    except Exception as e:
+        logger.logEvent('Error', f'Error while exporting table {table_name}: {e}')
+        return False
\ No newline at end of file
@@ -1,15 +1,40 @@
 '''This file contains the table operations class'''
+import csv
 import psycopg2
+from io import StringIO, BytesIO
+from struct import pack
+from time import perf_counter
 from logger_class import Logger
+from metrics_class import Metrics
+from schema_inference import getConverters, getBinaryEncoders
+
+# checkpoints of the byte ranges of a parallel load are keyed by the checkpoint key, this separator and the range number
+RANGE_KEY_SEPARATOR = '#range'
 
 
 class TableOperations:
     '''Class containing methods to perform operations on a table'''
     insert_query = None
+    copy_query = None
+    copy_format = None
+    encoding = 'utf-8'
+    csv_dialect = 'excel'
+    checkpoint_table = None
+    manifest_table = None
+    sync_table = None
+    chunk = None
+    upsert_queries = None
+    checkpoint = None
+    column_types = None
+    converters = None
+    binary_encoders = None
     retries = None
+    # seconds the last successful batch spent sending its statements and committing, without reading or encoding
+    commit_latency = None
     database_object = None
     cursor = None
     logger = Logger()
+    metrics = Metrics()
     
     
     def setInsertQuery(self, insert_query):
@@ -17,12 +42,62 @@ class TableOperations:
         self.insert_query = insert_query
     
     
+    def setCopyQuery(self, copy_query, copy_format, encoding='utf-8', csv_dialect='excel'):
+        '''This method sets the COPY query, the format it expects and the encoding and dialect of raw blocks'''
+        self.copy_query = copy_query
+        self.copy_format = copy_format
+        self.encoding = encoding
+        self.csv_dialect = csv_dialect
+    
+    
+    def setColumnTypes(self, column_types):
+        '''This method sets the column types used to load rows in typed form'''
+        self.column_types = column_types
+        self.converters = getConverters(column_types)
+        self.binary_encoders = getBinaryEncoders(column_types)
+    
+    
+    def convertRow(self, row):
+        '''This method converts the fields of a row into typed values'''
+        return tuple(converter(value) for converter, value in zip(self.converters, row))
+    
+    
+    def setCheckpointTable(self, checkpoint_table):
+        '''This method sets the name of the table holding the load checkpoints'''
+        self.checkpoint_table = checkpoint_table
+    
+    
+    def setCheckpoint(self, table_name, file_identity, batch_number, byte_offset, row_count, batch_size=None, range_end=None):
+        '''This method sets the checkpoint to be written with the next committed batch, range_end marking the checkpoint of a byte range'''
+        self.checkpoint = (table_name, file_identity['size'], file_identity['mtime'], file_identity['hash'], batch_number, byte_offset, row_count, batch_size, range_end)
+    
+    
+    def setChunk(self, table_name, chunk_number, chunk_hash, end_offset):
+        '''This method sets the file chunk that the next committed batch replaces in an incremental sync'''
+        self.chunk = (table_name, chunk_number, chunk_hash, end_offset)
+    
+    
+    def clearChunk(self):
+        '''This method stops tagging batches with a file chunk'''
+        self.chunk = None
+    
+    
+    def setUpsertQueries(self, upsert_queries):
+        '''This method sets the queries creating the temporary batch table and merging it into the table on its key'''
+        self.upsert_queries = upsert_queries
+    
+    
     def setDatabaseAndCursor(self, db):
         '''This method sets the database and cursor object'''
         self.database_object = db
         self.cursor = db.getCursor()
     
     
+    def refreshCursor(self):
+        '''This method takes a cursor from the current connection, which changes after a reconnect'''
+        self.cursor = self.database_object.getCursor()
+    
+    
     def createTable(self, table_name, create_query):
         '''This method creates the required table if it doesn't exist'''
         try:
@@ -34,28 +109,458 @@ class TableOperations:
             self.database_object.rollback()
     
     
+    def createUniqueKey(self, table_name, key_columns):
+        '''This method creates the unique index that batches are merged on'''
+        try:
+            self.cursor.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS {table_name}_upsert_key ON {table_name} ({', '.join(key_columns)});")
+            if not self.database_object.commitChanges():
+                raise psycopg2.DatabaseError('Commit failed')
+            self.logger.logEvent('Info', f'Created unique key on {key_columns} for table {table_name}')
+            return True
+        except psycopg2.Error as pe:
+            self.logger.logEvent('Error', f'Could not create unique key on {key_columns} for table {table_name}: {pe}')
+            self.database_object.rollback()
+            return False
+    
+    
+    def prepareUpsert(self):
+        '''This method creates the temporary batch table on the current connection unless it already has it'''
+        if self.upsert_queries:
+            self.cursor.execute(self.upsert_queries[0])
+    
+    
+    def mergeUpsert(self):
+        '''This method merges the batch from the temporary table into the table, so a replayed batch changes nothing'''
+        if self.upsert_queries:
+            self.cursor.execute(self.upsert_queries[1])
+    
+    
     def insertRows(self, entries):
         '''This method inserts rows into table'''
         try:
             if not self.retries:
                 self.retries = 0
             if self.retries > 3:
+                self.retries = None
                 return False
-            values = ','.join(self.cursor.mogrify(self.insert_query[1], i).decode('utf-8')
-                for i in entries)
+            stage_start = perf_counter()
+            if self.converters:
+                values = ','.join(self.cursor.mogrify(self.insert_query[1], self.convertRow(i)).decode('utf-8')
+                    for i in entries)
+            else:
+                values = ','.join(self.cursor.mogrify(self.insert_query[1], i).decode('utf-8')
+                    for i in entries)
+            self.metrics.addStageTime('encode', perf_counter() - stage_start)
+            stage_start = perf_counter()
+            self.writeChunk()
+            self.prepareUpsert()
             self.cursor.execute(self.insert_query[0] + values + ';')
-            self.database_object.commitChanges()
+            self.mergeUpsert()
+            self.writeCheckpoint()
+            network_seconds = perf_counter() - stage_start
+            self.metrics.addStageTime('network', network_seconds)
+            stage_start = perf_counter()
+            if not self.database_object.commitChanges():
+                raise psycopg2.DatabaseError('Commit failed')
+            commit_seconds = perf_counter() - stage_start
+            self.metrics.addStageTime('commit', commit_seconds)
+            self.commit_latency = network_seconds + commit_seconds
             self.logger.logEvent('Info', f'Inserted {len(entries)} rows into table')
             self.retries = None
             return True
-        except psycopg2.DatabaseError as dbe:
+        except (psycopg2.DatabaseError, psycopg2.InterfaceError) as dbe:
             self.logger.logEvent('Error', f'Database error while inserting {len(entries)} entries: {dbe}')
             self.database_object.rollback()
+            self.refreshCursor()
             self.retries += 1
-            self.insertRows(entries)
+            self.metrics.recordRetry()
+            return self.insertRows(entries)
         except psycopg2.Error as pe:
             self.logger.logEvent('Error', f'Error while inserting {len(entries)} entries: {pe}')
             self.database_object.rollback()
+            self.retries = None
+            return False
+    
+    
+    def encodeBinary(self, block):
+        '''This method encodes a block of csv lines into the COPY binary format, empty fields becoming NULL as in the csv format'''
+        buffer = bytearray(b'PGCOPY\n\xff\r\n\x00')
+        buffer += pack('!ii', 0, 0)
+        # the csv module only ends records at \r and \n, unlike splitlines, and honours quoting
+        for fields in csv.reader(StringIO(block, newline=''), dialect=self.csv_dialect):
+            buffer += pack('!h', len(fields))
+            if self.binary_encoders:
+                for encoder, field in zip(self.binary_encoders, fields):
+                    data = encoder(field)
+                    if data is None:
+                        buffer += pack('!i', -1)
+                        continue
+                    buffer += pack('!i', len(data))
+                    buffer += data
+                continue
+            for field in fields:
+                if field == '':
+                    buffer += pack('!i', -1)
+                    continue
+                data = field.encode('utf-8')
+                buffer += pack('!i', len(data))
+                buffer += data
+        buffer += pack('!h', -1)
+        return bytes(buffer)
+    
+    
+    def encodeBlock(self, block):
+        '''This method encodes a block of raw lines into the payload expected by the COPY query, passing raw bytes through'''
+        if self.copy_format == 'binary':
+            stage_start = perf_counter()
+            payload = self.encodeBinary(block.decode(self.encoding) if isinstance(block, bytes) else block)
+            self.metrics.addStageTime('encode', perf_counter() - stage_start)
+            return payload
+        return block
+    
+    
+    def copyRows(self, block, no_of_rows, is_encoded=False):
+        '''This method streams a block of raw lines into table using COPY FROM STDIN'''
+        try:
+            if not self.retries:
+                self.retries = 0
+            if self.retries > 3:
+                self.retries = None
+                return False
+            payload = block if is_encoded else self.encodeBlock(block)
+            stream = BytesIO(payload) if isinstance(payload, bytes) else StringIO(payload)
+            stage_start = perf_counter()
+            self.writeChunk()
+            self.prepareUpsert()
+            self.cursor.copy_expert(self.copy_query, stream)
+            self.mergeUpsert()
+            self.writeCheckpoint()
+            network_seconds = perf_counter() - stage_start
+            self.metrics.addStageTime('network', network_seconds)
+            stage_start = perf_counter()
+            if not self.database_object.commitChanges():
+                raise psycopg2.DatabaseError('Commit failed')
+            commit_seconds = perf_counter() - stage_start
+            self.metrics.addStageTime('commit', commit_seconds)
+            self.commit_latency = network_seconds + commit_seconds
+            self.logger.logEvent('Info', f'Copied {no_of_rows} rows into table')
+            self.retries = None
+            return True
+        except (psycopg2.DatabaseError, psycopg2.InterfaceError) as dbe:
+            self.logger.logEvent('Error', f'Database error while copying {no_of_rows} entries: {dbe}')
+            self.database_object.rollback()
+            self.refreshCursor()
+            self.retries += 1
+            self.metrics.recordRetry()
+            return self.copyRows(block, no_of_rows, is_encoded)
+        except psycopg2.Error as pe:
+            self.logger.logEvent('Error', f'Error while copying {no_of_rows} entries: {pe}')
+            self.database_object.rollback()
+            self.retries = None
+            return False
+    
+    
+    def createCheckpointTable(self):
+        '''This method creates the checkpoint table if it doesn't exist'''
+        try:
+            self.cursor.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.checkpoint_table} (table_name varchar PRIMARY KEY, "
+                "file_size bigint, file_mtime double precision, file_hash varchar, batch_number bigint, "
+                "byte_offset bigint, row_count bigint, batch_size bigint, updated_at timestamp DEFAULT now());"
+            )
+            self.cursor.execute(f"ALTER TABLE {self.checkpoint_table} ADD COLUMN IF NOT EXISTS batch_size bigint;")
+            self.cursor.execute(f"ALTER TABLE {self.checkpoint_table} ADD COLUMN IF NOT EXISTS range_end bigint;")
+            self.database_object.commitChanges()
+            self.logger.logEvent('Info', f'Created checkpoint table - {self.checkpoint_table}')
+        except psycopg2.Error as pe:
+            self.logger.logEvent('Error', f'Could not create checkpoint table {self.checkpoint_table}: {pe}')
+            self.database_object.rollback()
+    
+    
+    def writeCheckpoint(self):
+        '''This method writes the pending checkpoint in the current transaction'''
+        if not self.checkpoint or not self.checkpoint_table:
+            return
+        self.cursor.execute(
+            f"INSERT INTO {self.checkpoint_table} (table_name, file_size, file_mtime, file_hash, batch_number, byte_offset, row_count, batch_size, range_end) "
+            "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s) ON CONFLICT (table_name) DO UPDATE SET "
+            "file_size = EXCLUDED.file_size, file_mtime = EXCLUDED.file_mtime, file_hash = EXCLUDED.file_hash, "
+            "batch_number = EXCLUDED.batch_number, byte_offset = EXCLUDED.byte_offset, row_count = EXCLUDED.row_count, "
+            "batch_size = EXCLUDED.batch_size, range_end = EXCLUDED.range_end, updated_at = now();",
+            self.checkpoint
+        )
+    
+    
+    def getCheckpoint(self, table_name, file_identity):
+        '''This method returns the checkpoint of the table if it was written for the same file'''
+        try:
+            self.cursor.execute(
+                f"SELECT file_size, file_mtime, file_hash, batch_number, byte_offset, row_count FROM {self.checkpoint_table} WHERE table_name = %s;",
+                (table_name,)
+            )
+            row = self.cursor.fetchone()
+            self.database_object.commitChanges()
+            if not row:
+                return None
+            if (row[0], row[1], row[2]) != (file_identity['size'], file_identity['mtime'], file_identity['hash']):
+                self.logger.logEvent('Warning', f'Checkpoint of table {table_name} was written for a different file')
+                return None
+            return {'batch_number': row[3], 'byte_offset': row[4], 'row_count': row[5]}
+        except psycopg2.Error as pe:
+            self.logger.logEvent('Error', f'Error while retrieving checkpoint of table {table_name}: {pe}')
+            self.database_object.rollback()
+            return None
+    
+    
+    def deleteCheckpoint(self, table_name):
+        '''This method deletes the checkpoint of the table along with the checkpoints of its byte ranges'''
+        try:
+            self.cursor.execute(
+                f"DELETE FROM {self.checkpoint_table} WHERE table_name = %s OR starts_with(table_name, %s);",
+                (table_name, table_name + RANGE_KEY_SEPARATOR)
+            )
+            self.database_object.commitChanges()
+            self.logger.logEvent('Info', f'Deleted checkpoint of table {table_name}')
+        except psycopg2.Error as pe:
+            self.logger.logEvent('Error', f'Error while deleting checkpoint of table {table_name}: {pe}')
+            self.database_object.rollback()
+    
+    
+    def getRangeCheckpoints(self, table_name, file_identity):
+        '''This method returns the committed offset, end and rows of every byte range of a parallel load of the same file'''
+        try:
+            self.cursor.execute(
+                f"SELECT table_name, byte_offset, range_end, row_count FROM {self.checkpoint_table} "
+                "WHERE starts_with(table_name, %s) AND file_size = %s AND file_mtime = %s AND file_hash = %s;",
+                (table_name + RANGE_KEY_SEPARATOR, file_identity['size'], file_identity['mtime'], file_identity['hash'])
+            )
+            rows = self.cursor.fetchall()
+            self.database_object.commitChanges()
+            return {
+                int(range_key[len(table_name + RANGE_KEY_SEPARATOR):]): {'committed': byte_offset, 'end': range_end, 'rows': row_count}
+                for range_key, byte_offset, range_end, row_count in rows
+            }
+        except psycopg2.Error as pe:
+            self.logger.logEvent('Error', f'Error while retrieving range checkpoints of table {table_name}: {pe}')
+            self.database_object.rollback()
+            return None
+    
+    
+    def writeRangeCheckpoints(self, table_name, file_identity, ranges):
+        '''This method records the byte ranges of a parallel load before any of them is loaded'''
+        try:
+            for range_id, current in ranges.items():
+                self.setCheckpoint(table_name + RANGE_KEY_SEPARATOR + str(range_id), file_identity, range_id, current['committed'], current['rows'], None, current['end'])
+                self.writeCheckpoint()
+            self.checkpoint = None
+            if not self.database_object.commitChanges():
+                raise psycopg2.DatabaseError('Commit failed')
+            return True
+        except psycopg2.Error as pe:
+            self.logger.logEvent('Error', f'Error while writing range checkpoints of table {table_name}: {pe}')
+            self.database_object.rollback()
+            return False
+    
+    
+    def finishRangeCheckpoints(self, table_name, file_identity, batch_number, byte_offset, row_count):
+        '''This method replaces the range checkpoints of a finished parallel load by one checkpoint at the end of the file'''
+        try:
+            self.cursor.execute(f"DELETE FROM {self.checkpoint_table} WHERE starts_with(table_name, %s);", (table_name + RANGE_KEY_SEPARATOR,))
+            self.setCheckpoint(table_name, file_identity, batch_number, byte_offset, row_count)
+            self.writeCheckpoint()
+            self.checkpoint = None
+            if not self.database_object.commitChanges():
+                raise psycopg2.DatabaseError('Commit failed')
+            return True
+        except psycopg2.Error as pe:
+            self.logger.logEvent('Error', f'Error while finishing range checkpoints of table {table_name}: {pe}')
+            self.database_object.rollback()
+            return False
+    
+    
+    def createPartition(self, parent_table, partition_table, bounds):
+        '''This method creates the range partition of the parent table, or its default partition if bounds is None'''
+        try:
+            if bounds:
+                self.cursor.execute(
+                    f"CREATE TABLE IF NOT EXISTS {partition_table} PARTITION OF {parent_table} FOR VALUES FROM (%s) TO (%s);",
+                    bounds
+                )
+            else:
+                self.cursor.execute(f"CREATE TABLE IF NOT EXISTS {partition_table} PARTITION OF {parent_table} DEFAULT;")
+            if not self.database_object.commitChanges():
+                raise psycopg2.DatabaseError('Commit failed')
+            self.logger.logEvent('Info', f'Created partition {partition_table} of table {parent_table}')
+            return True
+        except psycopg2.Error as pe:
+            self.logger.logEvent('Error', f'Could not create partition {partition_table} of table {parent_table}: {pe}')
+            self.database_object.rollback()
+            return False
+    
+    
+    def setManifestTable(self, manifest_table):
+        '''This method sets the name of the table recording the completely loaded files'''
+        self.manifest_table = manifest_table
+    
+    
+    def createManifestTable(self):
+        '''This method creates the manifest table if it doesn't exist'''
+        try:
+            self.cursor.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.manifest_table} (file_name varchar, table_name varchar, "
+                "file_size bigint, file_mtime double precision, file_hash varchar, row_count bigint, "
+                "loaded_at timestamp DEFAULT now(), PRIMARY KEY (file_name, table_name));"
+            )
+            self.database_object.commitChanges()
+            self.logger.logEvent('Info', f'Created manifest table - {self.manifest_table}')
+        except psycopg2.Error as pe:
+            self.logger.logEvent('Error', f'Could not create manifest table {self.manifest_table}: {pe}')
+            self.database_object.rollback()
+    
+    
+    def isFileLoaded(self, file_name, table_name, file_identity):
+        '''This method checks the manifest for a complete load of the same file into the table'''
+        try:
+            self.cursor.execute(
+                f"SELECT file_size, file_mtime, file_hash FROM {self.manifest_table} WHERE file_name = %s AND table_name = %s;",
+                (file_name, table_name)
+            )
+            row = self.cursor.fetchone()
+            self.database_object.commitChanges()
+            return bool(row) and (row[0], row[1], row[2]) == (file_identity['size'], file_identity['mtime'], file_identity['hash'])
+        except psycopg2.Error as pe:
+            self.logger.logEvent('Error', f'Error while checking manifest for file {file_name}: {pe}')
+            self.database_object.rollback()
+            return False
+    
+    
+    def writeManifestEntry(self, file_name, table_name, file_identity, row_count):
+        '''This method records that the file has been loaded into the table completely'''
+        try:
+            self.cursor.execute(
+                f"INSERT INTO {self.manifest_table} (file_name, table_name, file_size, file_mtime, file_hash, row_count) "
+                "VALUES (%s, %s, %s, %s, %s, %s) ON CONFLICT (file_name, table_name) DO UPDATE SET "
+                "file_size = EXCLUDED.file_size, file_mtime = EXCLUDED.file_mtime, file_hash = EXCLUDED.file_hash, "
+                "row_count = EXCLUDED.row_count, loaded_at = now();",
+                (file_name, table_name, file_identity['size'], file_identity['mtime'], file_identity['hash'], row_count)
+            )
+            if not self.database_object.commitChanges():
+                raise psycopg2.DatabaseError('Commit failed')
+            self.logger.logEvent('Info', f'Recorded file {file_name} as loaded into table {table_name}')
+            return True
+        except psycopg2.Error as pe:
+            self.logger.logEvent('Error', f'Error while recording file {file_name} in manifest: {pe}')
+            self.database_object.rollback()
+            return False
+    
+    
+    def deleteManifestEntry(self, file_name, table_name):
+        '''This method forgets that the file was loaded into the table so it gets loaded again'''
+        try:
+            self.cursor.execute(f"DELETE FROM {self.manifest_table} WHERE file_name = %s AND table_name = %s;", (file_name, table_name))
+            self.database_object.commitChanges()
+            self.logger.logEvent('Info', f'Removed file {file_name} from manifest of table {table_name}')
+        except psycopg2.Error as pe:
+            self.logger.logEvent('Error', f'Error while removing file {file_name} from manifest: {pe}')
+            self.database_object.rollback()
+    
+    
+    def setSyncTable(self, sync_table):
+        '''This method sets the name of the table holding the hashes of synced file chunks'''
+        self.sync_table = sync_table
+    
+    
+    def createSyncTable(self):
+        '''This method creates the sync table if it doesn't exist'''
+        try:
+            self.cursor.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.sync_table} (table_name varchar, chunk_number bigint, "
+                "chunk_hash varchar, end_offset bigint, synced_at timestamp DEFAULT now(), PRIMARY KEY (table_name, chunk_number));"
+            )
+            self.database_object.commitChanges()
+            self.logger.logEvent('Info', f'Created sync table - {self.sync_table}')
+        except psycopg2.Error as pe:
+            self.logger.logEvent('Error', f'Could not create sync table {self.sync_table}: {pe}')
+            self.database_object.rollback()
+    
+    
+    def addChunkColumn(self, table_name):
+        '''This method adds the column tagging every row with the file chunk it was loaded from'''
+        try:
+            self.cursor.execute(
+                f"ALTER TABLE {table_name} ADD COLUMN IF NOT EXISTS dbtodb_chunk bigint "
+                "DEFAULT current_setting('dbtodb.chunk', true)::bigint;"
+            )
+            self.cursor.execute(f"CREATE INDEX IF NOT EXISTS {table_name}_dbtodb_chunk_idx ON {table_name} USING brin (dbtodb_chunk);")
+            if not self.database_object.commitChanges():
+                raise psycopg2.DatabaseError('Commit failed')
+            self.logger.logEvent('Info', f'Added chunk column to table {table_name}')
+            return True
+        except psycopg2.Error as pe:
+            self.logger.logEvent('Error', f'Error while adding chunk column to table {table_name}: {pe}')
+            self.database_object.rollback()
+            return False
+    
+    
+    def getSyncChunks(self, table_name):
+        '''This method returns the hash and end offset of every synced chunk of the table'''
+        try:
+            self.cursor.execute(
+                f"SELECT chunk_number, chunk_hash, end_offset FROM {self.sync_table} WHERE table_name = %s;",
+                (table_name,)
+            )
+            rows = self.cursor.fetchall()
+            self.database_object.commitChanges()
+            return {row[0]: (row[1], row[2]) for row in rows}
+        except psycopg2.Error as pe:
+            self.logger.logEvent('Error', f'Error while retrieving synced chunks of table {table_name}: {pe}')
+            self.database_object.rollback()
+            return None
+    
+    
+    def writeChunk(self):
+        '''This method tags the rows of the current transaction with the pending chunk, replacing its earlier rows and hash'''
+        if not self.chunk or not self.sync_table:
+            return
+        table_name, chunk_number, chunk_hash, end_offset = self.chunk
+        self.cursor.execute("SELECT set_config('dbtodb.chunk', %s, true);", (str(chunk_number),))
+        self.cursor.execute(f"DELETE FROM {table_name} WHERE dbtodb_chunk = %s;", (chunk_number,))
+        self.cursor.execute(
+            f"INSERT INTO {self.sync_table} (table_name, chunk_number, chunk_hash, end_offset) VALUES (%s, %s, %s, %s) "
+            "ON CONFLICT (table_name, chunk_number) DO UPDATE SET chunk_hash = EXCLUDED.chunk_hash, "
+            "end_offset = EXCLUDED.end_offset, synced_at = now();",
+            self.chunk
+        )
+    
+    
+    def updateChunkEnds(self, table_name, chunk_ends):
+        '''This method records new end offsets of chunks whose lines moved without changing'''
+        try:
+            self.cursor.executemany(
+                f"UPDATE {self.sync_table} SET end_offset = %s WHERE table_name = %s AND chunk_number = %s;",
+                [(end_offset, table_name, chunk_number) for chunk_number, end_offset in chunk_ends.items()]
+            )
+            if not self.database_object.commitChanges():
+                raise psycopg2.DatabaseError('Commit failed')
+            return True
+        except psycopg2.Error as pe:
+            self.logger.logEvent('Error', f'Error while updating chunk ends of table {table_name}: {pe}')
+            self.database_object.rollback()
+            return False
+    
+    
+    def deleteChunksFrom(self, table_name, chunk_number):
+        '''This method deletes the rows and hashes of the chunks from the given one on, after the file has shrunk'''
+        try:
+            self.cursor.execute(f"DELETE FROM {table_name} WHERE dbtodb_chunk >= %s;", (chunk_number,))
+            self.cursor.execute(f"DELETE FROM {self.sync_table} WHERE table_name = %s AND chunk_number >= %s;", (table_name, chunk_number))
+            if not self.database_object.commitChanges():
+                raise psycopg2.DatabaseError('Commit failed')
+            self.logger.logEvent('Info', f'Deleted chunks of table {table_name} from chunk {chunk_number} on')
+            return True
+        except psycopg2.Error as pe:
+            self.logger.logEvent('Error', f'Error while deleting chunks of table {table_name}: {pe}')
+            self.database_object.rollback()
             return False
     
     
@@ -81,6 +586,47 @@ class TableOperations:
             self.database_object.rollback()
     
     
+    def promoteStagingTable(self, staging_table, table_name, index_columns):
+        '''This method logs, indexes and analyzes the staging table, then swaps it in place of the table in one transaction'''
+        try:
+            # SET LOGGED rewrites the table and its indexes, so it goes first to write the data once and keep the statistics
+            self.cursor.execute(f"ALTER TABLE {staging_table} SET LOGGED;")
+            for column in index_columns:
+                self.cursor.execute(f"CREATE INDEX IF NOT EXISTS {staging_table}_{column}_idx ON {staging_table} ({column});")
+            self.cursor.execute(f"ANALYZE {staging_table};")
+            if not self.database_object.commitChanges():
+                raise psycopg2.DatabaseError('Commit failed')
+            self.logger.logEvent('Info', f'Logged, indexed and analyzed staging table {staging_table}')
+            self.cursor.execute(f"DROP TABLE IF EXISTS {table_name};")
+            self.cursor.execute(f"ALTER TABLE {staging_table} RENAME TO {table_name};")
+            for column in index_columns:
+                self.cursor.execute(f"ALTER INDEX IF EXISTS {staging_table}_{column}_idx RENAME TO {table_name}_{column}_idx;")
+            # the next staging load creates its own unique key, so the swapped in one must not keep the staging name
+            self.cursor.execute(f"ALTER INDEX IF EXISTS {staging_table}_upsert_key RENAME TO {table_name}_upsert_key;")
+            if not self.database_object.commitChanges():
+                raise psycopg2.DatabaseError('Commit failed')
+            self.logger.logEvent('Info', f'Swapped staging table {staging_table} in place of {table_name}')
+            return True
+        except psycopg2.Error as pe:
+            self.logger.logEvent('Error', f'Error while swapping staging table {staging_table} in place of {table_name}: {pe}')
+            self.database_object.rollback()
+            return False
+    
+    
+    def getTableSize(self, table_name):
+        '''This method returns the on-disk size of the table including indexes, toast and its partitions'''
+        try:
+            self.cursor.execute("SELECT COALESCE(SUM(pg_total_relation_size(relid)), 0) FROM pg_partition_tree(%s);", (table_name,))
+            size = int(self.cursor.fetchone()[0])
+            self.database_object.commitChanges()
+            self.logger.logEvent('Info', f'Table {table_name} takes {size} bytes on disk')
+            return size
+        except psycopg2.Error as pe:
+            self.logger.logEvent('Error', f'Error while retrieving size of table {table_name}: {pe}')
+            self.database_object.rollback()
+            return -1
+    
+    
     def getCount(self, table_name):
         '''This method drops table if it exists'''
         try:
@@ -93,4 +639,67 @@ class TableOperations:
             return -1
         except psycopg2.Error as pe:
             self.logger.logEvent('Error', f'Error while counting rows of table {table_name}: {pe}')
-            return -1
\ No newline at end of file
+            return -1
+    
+    
+    def getLeafTables(self, table_name):
+        '''This method returns the tables holding the rows of the table, its leaf partitions or the table itself'''
+        try:
+            self.cursor.execute("SELECT relid::regclass::text FROM pg_partition_tree(%s) WHERE isleaf ORDER BY relid::regclass::text;", (table_name,))
+            leaf_tables = [row[0] for row in self.cursor.fetchall()]
+            self.database_object.commitChanges()
+            return leaf_tables or [table_name]
+        except psycopg2.Error as pe:
+            self.logger.logEvent('Error', f'Error while listing partitions of table {table_name}: {pe}')
+            self.database_object.rollback()
+            return None
+    
+    
+    def getColumnDefinitions(self, table_name):
+        '''This method returns the names and types of the columns of the table, none if it doesn't exist'''
+        try:
+            self.cursor.execute(
+                "SELECT attname, format_type(atttypid, atttypmod) FROM pg_attribute "
+                "WHERE attrelid = to_regclass(%s) AND attnum > 0 AND NOT attisdropped ORDER BY attnum;",
+                (table_name,)
+            )
+            columns = self.cursor.fetchall()
+            self.database_object.commitChanges()
+            return columns
+        except psycopg2.Error as pe:
+            self.logger.logEvent('Error', f'Error while retrieving columns of table {table_name}: {pe}')
+            self.database_object.rollback()
+            return None
+    
+    
+    def copyTableTo(self, table_name, file_object, options):
+        '''This method streams the table into the file object using COPY TO STDOUT and returns the number of rows'''
+        try:
+            self.cursor.copy_expert(f'COPY {table_name} TO STDOUT WITH (' + ', '.join(options) + ')', file_object)
+            no_of_rows = self.cursor.rowcount
+            self.database_object.commitChanges()
+            self.logger.logEvent('Info', f'Copied {no_of_rows} rows out of table {table_name}')
+            return no_of_rows
+        except psycopg2.Error as pe:
+            self.logger.logEvent('Error', f'Error while copying out table {table_name}: {pe}')
+            self.database_object.rollback()
+            return -1
+    
+    
+    def fetchChunks(self, table_name, no_of_rows):
+        '''This method yields the columns and rows of the table no_of_rows at a time through a server-side cursor, an empty table yielding its columns once with no rows'''
+        cursor = self.database_object.getConnection().cursor(name=f'export_{table_name}'.replace('.', '_'))
+        cursor.itersize = no_of_rows
+        try:
+            cursor.execute(f'SELECT * FROM {table_name};')
+            is_first_chunk = True
+            while True:
+                rows = cursor.fetchmany(no_of_rows)
+                if rows or is_first_chunk:
+                    yield [(column.name, column.type_code) for column in cursor.description], rows
+                if not rows:
+                    break
+                is_first_chunk = False
+        finally:
+            cursor.close()
+            self.database_object.commitChanges()
\ No newline at end of file